@@ -0,0 +1,67 @@
+"""Compare the dispatch overhead of the executor backends.
+
+Every task runs an interface-like subprocess, the same way node actions
+are executed. Run from the repository root:
+
+    python -m benchmarks.executors --tasks 500 --maxworkers 50
+"""
+
+import asyncio
+import subprocess
+import time
+
+import click
+
+from mudra.executors import EXECUTORS, create_executor
+
+
+def run_command(command):
+    """Run a command in a worker process or thread"""
+    return subprocess.run(['bash', '-c', command],
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT).returncode
+
+
+async def run_command_async(command):
+    """Run a command from the event loop"""
+    process = await asyncio.create_subprocess_exec(
+        'bash', '-c', command,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+    async for _ in process.stdout:
+        pass
+    return await process.wait()
+
+
+def benchmark(backend, tasks, maxworkers, command):
+    """Get the startup and run times in seconds of a backend"""
+    function = run_command_async if backend == 'asyncio' else run_command
+    started = time.monotonic()
+    executor = create_executor(backend, maxworkers)
+    # Wait for the workers to be up before timing the tasks
+    executor.submit(len, ()).result()
+    ready = time.monotonic()
+    results = list(executor.map(function, [command] * tasks))
+    finished = time.monotonic()
+    executor.shutdown()
+    if any(results):
+        raise click.ClickException(f'{backend}: command failed')
+    return ready - started, finished - ready
+
+
+@click.command()
+@click.option('--tasks', default=200, help='Number of tasks per backend')
+@click.option('--maxworkers', default=20, help='Number of workers')
+@click.option('--command', default='true', help='Command run by every task')
+@click.option('--backend', 'backends', multiple=True, default=EXECUTORS,
+              type=click.Choice(EXECUTORS), help='Backends to compare (Default: all)')
+def cli(tasks, maxworkers, command, backends):
+    click.echo(f'{tasks} tasks, {maxworkers} workers, command: {command}')
+    click.echo(f'{"backend":<10}{"startup s":>12}{"run s":>12}{"per task ms":>14}')
+    for backend in backends:
+        startup, run = benchmark(backend, tasks, maxworkers, command)
+        click.echo(f'{backend:<10}{startup:>12.3f}{run:>12.3f}'
+                   f'{run / tasks * 1000:>14.2f}')
+
+
+if __name__ == '__main__':
+    cli()
@@ -1,7 +1,6 @@
 #!/bin/bash
 NAME=$1
 SLEEP_SECONDS=$2
-NODE_ENV_FILE=$3
 
 echo "INFO: Check script for ${NAME} running..."
 
@@ -9,8 +8,7 @@ echo "INFO: Check script for ${NAME} running..."
 readonly ROOT_DIR="$(cd "$(dirname "${0}")" && pwd)"
 source "${ROOT_DIR}/../common.sh" || exit 1
 
-# Source the node env file
-source ".meta/${NODE_ENV_FILE}.env"
+# The node environment is inherited from the node interface
 
 # Force login to k8s on AWS
 # kubectl --namespace alfa auth can-i get pod --quiet || true
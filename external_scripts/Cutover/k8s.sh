@@ -3,7 +3,6 @@ set -eux
 
 NAME=$1
 SLEEP_SECONDS=$2
-NODE_ENV_FILE=$3
 
 echo "INFO: Executing k8s script for ${NAME}"
 
@@ -11,8 +10,7 @@ echo "INFO: Executing k8s script for ${NAME}"
 readonly ROOT_DIR="$(cd "$(dirname "${0}")" && pwd)"
 source "${ROOT_DIR}/../common.sh" || exit 1
 
-# Source the node env file
-source ".meta/${NODE_ENV_FILE}.env"
+# The node environment is inherited from the node interface
 
 # Force login to k8s on AWS
 # kubectl --namespace alfa auth can-i get pod --quiet || true
@@ -422,7 +420,7 @@ function save_effective_replica_count() {
     local replica_count=$3
     # Log what we are doing to stdout
     echo "INFO: Executing, save_effective_replica_count ${name} ${context} ${replica_count}" >&2
-    local effective_replica_count_file="${EFFECTIVE_REPLICA_COUNT_PATH}/${NODE_ENV_FILE}-${name}-${context}.txt"
+    local effective_replica_count_file="${EFFECTIVE_REPLICA_COUNT_PATH}/${NAME}-${name}-${context}.txt"
     # Cache effective replica count, overwriting existing file
     touch ${effective_replica_count_file}
     echo $replica_count >${effective_replica_count_file}
@@ -444,7 +442,7 @@ function read_effective_replica_count() {
     local context=$2
     # Log what we are doing to stdout
     # echo "INFO: Executing, read_effective_replica_count ${name} ${context}" >&2
-    local effective_replica_count_file="${EFFECTIVE_REPLICA_COUNT_PATH}/${NODE_ENV_FILE}-${name}-${context}.txt"
+    local effective_replica_count_file="${EFFECTIVE_REPLICA_COUNT_PATH}/${NAME}-${name}-${context}.txt"
     # Read effective replica count
     local effective_replica_count=$(cat ${effective_replica_count_file})
     # Ensure effective replica count is a valid number, otherise return K8S_MIN_INSTANCES
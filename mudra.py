@@ -1,18 +1,19 @@
+import asyncio
+import contextlib
 import csv
+import hashlib
 import logging
 import sys
 import os
 import json
 import itertools
 import time
-from pathlib import Path
 import concurrent.futures
 from mudra import mlog
 # from mudra.mlog import config_root_logger, start_thread_logging, stop_thread_logging
 from mudra.mlog import start_thread_logging, stop_thread_logging
 import threading
 import shutil
-from pid import PidFile, PidFileError
 import subprocess
 import signal
 
@@ -22,21 +23,58 @@ import click
 import networkx as nx
 import matplotlib.pyplot as plt
 
-from dotenv.main import dotenv_values
 
 import sh
-from sh import ErrorReturnCode
+from sh import ErrorReturnCode, TimeoutException
 
 from mudra import charts
-from mudra.manifest import NodeLoader, ProcessLoader
+from mudra.components import Node
+from mudra.manifest import ManifestCache, NodeLoader, ProcessLoader
+from mudra.dotfiles import DotfileCache
+from mudra.daemons import InterfaceDaemonError, InterfaceDaemons
+from mudra.forkserver import ForkServer
+from mudra.executors import EXECUTORS
+from mudra.limits import ConcurrencyLimits, ConcurrencyPool, load_pools
+from mudra.plan import fingerprint, read_plan, write_plan
+from mudra.pool import WorkerPool
+from mudra.history import DurationHistory
+from mudra.journal import FAILED, INTERRUPTED, QUARANTINED, SUCCEEDED, RunJournal, lease_name
+from mudra.leases import LeaseHeldError, LeaseManager
+from mudra.selection import select_nodes, selected_graph
+from mudra.scheduler import Scheduler, critical_path_priorities, pipeline_graph
+from mudra.simulator import Simulation, critical_path, parse_worker_counts, simulate
+from mudra.tasks import NodeTask
 # from mudra.formatters import Click_Formatter
 from mudra.mlog import Mlog
 
+# Longest line of interface output read by the asyncio executor
+INTERFACE_OUTPUT_LIMIT = 1024 * 1024
+# Node data argument of the interfaces, the JSON is sent over stdin
+NODE_DATA_STDIN = '-'
+
+# Exit code of a post-process command stopped by its timeout, as timeout(1)
+PROCESS_TIMEOUT_EXIT_CODE = 124
+
+# Mudra attributes shared by every node, sent once to each worker
+WORKER_SETTINGS = ('environment', 'data_files_directory', 'extravars',
+                   'preflight', 'dryrun', 'force', 'loglevel',
+                   'thread_log_path', 'maxworkers', 'skipnodes',
+                   'daemons', 'fork_server')
+
+# Mudra attributes the schedule of a plan is compiled with, restored by --apply
+PLAN_SETTINGS = ('environment', 'phase', 'phases', 'process_single_action',
+                 'process_single_node', 'process_multiple_nodes',
+                 'process_node_filter', 'select_ancestors',
+                 'select_descendants', 'nodetype', 'skipnodes')
+# Run-time flags the schedule of a plan depends on, --apply requires the same
+PLAN_FLAGS = ('preflight', 'force')
+
 
 class Mudra:
     """Mudra"""
-    node_loader = NodeLoader()
-    process_loader = ProcessLoader()
+    manifest_cache = ManifestCache()
+    node_loader = NodeLoader(manifest_cache)
+    process_loader = ProcessLoader(manifest_cache)
     DG = nx.DiGraph()
     nodes = []
     nodes_failed_preflight = []
@@ -61,6 +99,30 @@ class Mudra:
     drawcharts = False
     force = False
     nodetype = None
+    select_ancestors = False
+    select_descendants = False
+    scheduler = 'waves'
+    executor = 'process'
+    pools = []
+    pipeline = False
+    daemons = False
+    batchsize = 1
+    interface_daemons = InterfaceDaemons()
+    forkserver = False
+    fork_server = None
+    worker_pool = None
+    history = DurationHistory()
+    dotfiles = DotfileCache()
+    journal = RunJournal()
+    leases = LeaseManager(journal)
+    inflight = None
+    plan_path = None
+    apply_path = None
+    phase_actions = None
+    phase_graphs = None
+    planned_waves = None
+    completed_nodes = set()
+    simulate_workers = None
     mlog = Mlog()
 
     def __init__(self):
@@ -115,70 +177,229 @@ class Mudra:
                 interface_file)
             self.node_interfaces[node_interface_name] = node_interface_extension
 
-    def process_node(self, node, cmd, dryrun):
+    def process_node(self, node, cmd, dryrun, phase=None):
         """Process node"""
         mlog.log.info(f"Executing node: {node.name}")
+        if phase is None:
+            phase = self.phase
         # Append `dryrun` to command if dryrun is enabled
         if dryrun:
             cmd = cmd + "dryrun"
         # Check node tracking directories, if node exists then skip node processing for this node (unforced only)
-        if os.path.exists(f'logs/executed_nodes/{node.name}-{self.environment}-{self.phase}-{cmd}') and not self.force and not dryrun:
+        if self.node_processed(node, cmd, dryrun, phase):
             mlog.log.info(f"Skipping processed node: {node.name}")
             return
+        self.start_node(node, cmd, dryrun, phase)
         # if os.path.exists(f'logs/failed_preflight/{node.type}_{node.name}'):
         #     mlog.log.info(f"Skipping node because it failed preflight checks: {node.name}")
         #     return
+        # Send the action to a running interface daemon
+        if self.daemons:
+            exit_code, output = self.interface_daemons.call(
+                self.interface_path(node), cmd, self.prepare_node_data(node))
+            print(output, end="")
+            return self.complete_node(node, cmd, dryrun, phase, exit_code, output)
+        # Fork the action from the preloaded interface
+        if self.fork_server and node.type in self.fork_server.interfaces:
+            exit_code, output = self.fork_server.run(
+                node.type, cmd, self.prepare_node_data(node))
+            return self.complete_node(node, cmd, dryrun, phase, exit_code, output)
         try:
-            # Convert node_data to json for passing to node interface
-            node_data = self.prepare_node_data(node).replace('"', '\\"')
-            # Execute command against node interface and pass in node data as json
-            for line in sh.bash("-c", self.node_interfaces_directory + '/' + node.type + self.node_interfaces[node.type] + ' ' + cmd + ' "' + node_data + '"', _err_to_out=True, _iter=True, _out_bufsize=0):
+            # Execute command against node interface and pass in node data as json over stdin
+            interface = sh.Command(self.interface_path(node))
+            for line in interface(cmd, NODE_DATA_STDIN, _in=self.prepare_node_data(node),
+                                  _err_to_out=True, _iter=True, _out_bufsize=0):
                 print(line, end="")
             # Record node in node tracking directory if not dryrun
             if not dryrun:
-                mlog.log.debug(f"Recording node: {node.name}")
-                if os.path.exists('logs/executed_nodes'):
-                    # Create new file in logs/executed_nodes directory if it doesn't exist
-                    open(f'logs/executed_nodes/{node.name}-{self.environment}-{self.phase}-{cmd}', 'a').close()
-                else:
-                    # Throw exception if node tracking directory does not exist
-                    raise Exception(
-                        "logs/executed_nodes directory does not exist")
+                self.record_node(node, cmd, phase)
+                return True
         except ErrorReturnCode as error:
             mlog.log.error("Error:" + error.stderr.decode("utf-8"))
             mlog.log.info("Error:" + error.stdout.decode("utf-8"))
-            # If dryrun is enabled, ignore error and continue
-            if dryrun:
-                mlog.log.info(f"Error: Action failed with dryrun enabled, continuing")
-                return
-            # If cmd is preflight then add node to self.nodes_failed_preflight and return
-            if cmd == 'preflight':
-                self.nodes_failed_preflight.append(node)
-                # Write node to file
-                with open(f'logs/failed_preflight/{node.type}_{node.name}', 'a') as f:
-                    f.write(f'{time.strftime("%Y%m%d %H:%M:%S")} {node.name}\n')
-                mlog.log.error(f'Error: Node {node.name} failed preflight')
-                return
-            elif not self.force:
-                sys.exit(error.exit_code)
+            self.node_failed(node, cmd, dryrun, phase, error.exit_code)
+
+    async def process_node_async(self, node, cmd, dryrun, phase=None):
+        """Process node from the event loop of the asyncio executor"""
+        # Interface daemons and the fork server answer over blocking calls, wait for them in a thread
+        if self.daemons or (self.fork_server and node.type in self.fork_server.interfaces):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.process_node, node, cmd, dryrun, phase)
+        mlog.log.info(f"Executing node: {node.name}")
+        if phase is None:
+            phase = self.phase
+        # Append `dryrun` to command if dryrun is enabled
+        if dryrun:
+            cmd = cmd + "dryrun"
+        # Check node tracking directories, if node exists then skip node processing for this node (unforced only)
+        if self.node_processed(node, cmd, dryrun, phase):
+            mlog.log.info(f"Skipping processed node: {node.name}")
+            return
+        self.start_node(node, cmd, dryrun, phase)
+        # Execute command against node interface, send the node data and stream its output
+        process = await asyncio.create_subprocess_exec(
+            self.interface_path(node), cmd, NODE_DATA_STDIN,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT, limit=INTERFACE_OUTPUT_LIMIT)
+        process.stdin.write(self.prepare_node_data(node).encode())
+        try:
+            await process.stdin.drain()
+        # Interface exited without reading its node data
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        process.stdin.close()
+        output = []
+        async for line in process.stdout:
+            line = line.decode('utf-8', errors='replace')
+            output.append(line)
+            print(line, end="")
+        exit_code = await process.wait()
+        return self.complete_node(node, cmd, dryrun, phase, exit_code, ''.join(output))
+
+    def process_nodes(self, nodes, cmd, dryrun, phase):
+        """Process nodes of the same type with a single interface call, return the names of the recorded nodes"""
+        # Append `dryrun` to command if dryrun is enabled
+        if dryrun:
+            cmd = cmd + "dryrun"
+        # Skip processed nodes (unforced only)
+        pending_nodes = []
+        for node in nodes:
+            if self.node_processed(node, cmd, dryrun, phase):
+                mlog.log.info(f"Skipping processed node: {node.name}")
+            else:
+                self.start_node(node, cmd, dryrun, phase)
+                pending_nodes.append(node)
+        nodes = pending_nodes
+        if not nodes:
+            return set()
+        mlog.log.info(
+            f"Executing nodes: {', '.join(node.name for node in nodes)}")
+        results = self.run_interface_batch(nodes, cmd)
+        executed = set()
+        for node in nodes:
+            result = results.get(node.name, dict(
+                exit_code=1, output=f'No result for node {node.name}\n'))
+            print(result['output'], end="")
+            if self.complete_node(node, cmd, dryrun, phase,
+                                  result['exit_code'], result['output']):
+                executed.add(node.name)
+        return executed
+
+    def run_interface_batch(self, nodes, cmd):
+        """Run an action of the interface for nodes, get the result of every node by name"""
+        path = self.interface_path(nodes[0])
+        nodes_data = '[' + ', '.join(map(self.prepare_node_data, nodes)) + ']'
+        try:
+            if self.daemons:
+                return self.interface_daemons.request(
+                    path, 'batch', cmd, nodes_data)
+            process = subprocess.run([path, 'batch', cmd, NODE_DATA_STDIN],
+                                     input=nodes_data, stdout=subprocess.PIPE, text=True)
+            if not process.returncode:
+                return json.loads(process.stdout)
+            error = f'{path} batch exited with code {process.returncode}'
+        except (InterfaceDaemonError, ValueError) as e:
+            error = str(e)
+        mlog.log.error(f'Error: {error}')
+        return {node.name: dict(exit_code=1, output=error + '\n')
+                for node in nodes}
+
+    def complete_node(self, node, cmd, dryrun, phase, exit_code, output):
+        """Record the executed node action or handle its failure"""
+        if exit_code:
+            mlog.log.info("Error:" + output)
+            self.node_failed(node, cmd, dryrun, phase, exit_code)
+            return
+        # Record node in node tracking directory if not dryrun
+        if not dryrun:
+            self.record_node(node, cmd, phase)
+            return True
+
+    def interface_path(self, node):
+        """Path of the node interface script"""
+        return self.node_interfaces_directory + '/' + node.type + self.node_interfaces[node.type]
+
+    def node_inputs_hash(self, node):
+        """Hash of the resolved inputs of a node action: manifest, meta, credentials and extravars"""
+        # Only the fields of the node itself, parents and manifest path change with other nodes
+        node_data = dict(type=node.type,
+                         dependencies=node.dependencies,
+                         meta={**node.meta, **self.load_node_meta(node)},
+                         actions=node.actions,
+                         environments=node.environments,
+                         labels=node.labels)
+        inputs = [node_data, self.load_node_credentials(node),
+                  self.load_environment_meta(), self.load_environment_credentials(),
+                  self.load_extravars(), self.preflight]
+        return hashlib.sha256(
+            json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def node_processed(self, node, cmd, dryrun, phase):
+        """Check if the node action was already executed with the same inputs (unforced only)"""
+        if self.force or dryrun:
+            return False
+        state = self.journal.lookup(node.name, self.environment, phase, cmd)
+        if state is None or state['status'] != SUCCEEDED:
+            return False
+        # Nodes recorded before inputs were hashed are kept as processed
+        if state['inputs_hash'] and state['inputs_hash'] != self.node_inputs_hash(node):
+            mlog.log.info(f"Inputs changed since last execution: {node.name}")
+            return False
+        return True
+
+    def start_node(self, node, cmd, dryrun, phase):
+        """Record the start of a node action in the run journal"""
+        if not dryrun:
+            self.journal.start(node, self.environment, phase, cmd)
+
+    def record_node(self, node, cmd, phase):
+        """Record the executed node action in the run journal with the hash of its inputs"""
+        mlog.log.debug(f"Recording node: {node.name}")
+        self.journal.finish(node, self.environment, phase, cmd, 0,
+                            self.node_inputs_hash(node))
+
+    def node_failed(self, node, cmd, dryrun, phase, exit_code):
+        """Handle a failed node action"""
+        # If dryrun is enabled, ignore error and continue
+        if dryrun:
+            mlog.log.info(f"Error: Action failed with dryrun enabled, continuing")
+            return
+        self.journal.finish(node, self.environment, phase, cmd, exit_code)
+        # If cmd is preflight then add node to self.nodes_failed_preflight and return
+        if cmd == 'preflight':
+            self.nodes_failed_preflight.append(node)
+            mlog.log.error(f'Error: Node {node.name} failed preflight')
+            return
+        elif not self.force:
+            sys.exit(exit_code)
 
     def execute_process(self, process):
-        """Execute process"""
+        """Execute process, its output prefixed with its name"""
         mlog.log.info(f"Executing process: {process}")
+        name = process["name"]
         for process_command in process["actions"]:
+            # Commands are strings, or dicts with a command and its timeout
+            timeout = process.get("timeout")
+            if isinstance(process_command, dict):
+                timeout = process_command.get("timeout", timeout)
+                process_command = process_command["command"]
             try:
                 # Execute command against process
-                mlog.log.info(f"Executing command: {process_command}")
-                for line in sh.bash("-c", process_command, _err_to_out=True, _iter=True, _out_bufsize=0):
-                    print(line, end="")
+                mlog.log.info(f"Executing command: [{name}] {process_command}")
+                # Line buffered, to prefix whole lines
+                for line in sh.bash("-c", process_command, _err_to_out=True, _iter=True, _out_bufsize=1, _timeout=timeout):
+                    print(f"[{name}] {line}", end="")
+            except TimeoutException:
+                mlog.log.error(f"Error: [{name}] command timed out after {timeout}s: {process_command}")
+                sys.exit(PROCESS_TIMEOUT_EXIT_CODE)
             except ErrorReturnCode as error:
-                mlog.log.error("Error:" + error.stderr.decode("utf-8"))
-                mlog.log.info("Error:" + error.stdout.decode("utf-8"))
+                mlog.log.error(f"Error: [{name}] " + error.stderr.decode("utf-8"))
+                mlog.log.info(f"Error: [{name}] " + error.stdout.decode("utf-8"))
                 sys.exit(error.exit_code)
 
     def prepare_node_data(self, node):
         """Prepare node data"""
-        return json.dumps(vars(node))
+        return json.dumps(node.to_dict())
 
     def load_node_meta(self, node):
         """Load node meta"""
@@ -231,19 +452,16 @@ class Mudra:
     def load_dotfile(self, dotfile_path):
         """Load dotfile"""
         mlog.log.debug(f"Loading dotfile: {dotfile_path}")
-        if os.path.isfile(dotfile_path):
-            dotfile_content = dotenv_values(dotfile_path)
-            mlog.log.debug(f"Dotfile content: {dotfile_content}")
-            return dotfile_content
-        else:
-            return {}
+        # Parsed once per change of the file
+        return self.dotfiles.load(dotfile_path)
 
     def generate_node_environment(self, node):
         """Generate node environment"""
         mlog.log.debug(f"Generating node environment: {node.name}")
         # Merge node meta data
-        if self.load_node_meta(node):
-            node.meta = {**node.meta, **self.load_node_meta(node)}
+        node_meta = self.load_node_meta(node)
+        if node_meta:
+            node.meta = {**node.meta, **node_meta}
         # mlog.log.debug(f"Node meta: {node.meta}")
         # Load node credentials
         node_credentials = self.load_node_credentials(node)
@@ -256,38 +474,19 @@ class Mudra:
         # Load environment credentials
         environment_credentials = self.load_environment_credentials()
         # app.mlog.log.debug(environment_credentials)
-        Path(".meta").mkdir(parents=True, exist_ok=True)
-        # Generate DOTFILE
-        dotfile_content = ""
-        # Iterate through node meta
-        for k, v in node.meta.items():
-            dotfile_content += k + '=' + '"' + str(v) + '"\n'
-        # Iterate through node credentials
-        for k, v in node_credentials.items():
-            dotfile_content += k + '=' + '"' + str(v) + '"\n'
-        # Iterate through environment meta
-        for k, v in environment_meta.items():
-            dotfile_content += k + '=' + '"' + str(v) + '"\n'
-        # Iterate through extravars
-        for k, v in extravars.items():
-            dotfile_content += k + '=' + '"' + str(v) + '"\n'
-        # Iterate through environment credentials
-        for k, v in environment_credentials.items():
-            dotfile_content += k + '=' + '"' + str(v) + '"\n'
+        # Generate the node environment, sent with the node data
+        variables = [node.meta, node_credentials, environment_meta,
+                     extravars, environment_credentials]
         # Add preflight to environment variables
         if self.preflight:
-            dotfile_content += 'PREFLIGHT="True"\n'
+            variables.append(dict(PREFLIGHT='True'))
         # Add dryrun to environment variables
         if self.dryrun:
-            dotfile_content += 'DRYRUN="True"\n'
+            variables.append(dict(DRYRUN='True'))
         # Add environment to environment variables
         if self.environment:
-            dotfile_content += f'environment="{self.environment}"\n'
-        # Create DOTFILE for node (always re-create)
-        dotfile = open('.meta/' + node.name +
-                       f'-thread{node.thread_id}.env', 'w')
-        dotfile.write(dotfile_content)
-        dotfile.close()
+            variables.append(dict(environment=self.environment))
+        node.env = {k: str(v) for values in variables for k, v in values.items()}
         return node
 
     def generate_node_collection(self, graph):
@@ -330,9 +529,10 @@ class Mudra:
     def orchestrate_nodes(self):
         """Orchestrate nodes"""
         mlog.log.info("Orchestrating nodes")
-        # Iterate through the graph
+        # Iterate through the nodes with actions in the phase
+        graph = self.phase_graph()
         self.nodes = list(
-            reversed(list(nx.topological_sort(self.DG))))
+            reversed(list(nx.topological_sort(graph))))
         mlog.log.debug(self.nodes)
         # Execute each node interface based on node (type/content)
         # Disable threading logic if maxworkers is set to 1
@@ -343,146 +543,597 @@ class Mudra:
             for node in self.nodes:
                 node_count += 1
                 mlog.log.debug(f"{node_count}. {node}")
+            tasks = {node: self.node_task(node) for node in self.nodes}
+            completed = self.completed_tasks(tasks)
             for node in self.nodes:
+                if node in completed:
+                    continue
                 # Do orchestration for node
                 mlog.log.debug(f"Orchestrating node: {node}")
-                self.do_orchestration(node, self.node_loader)
+                self.record_durations(
+                    node, self.do_orchestration(tasks[node]))
+        elif self.scheduler == 'ready':
+            mlog.log.info("Threading enabled (ready-queue scheduler)")
+            self.worker_pool.check()
+            self.schedule_nodes(graph, self.node_priorities(graph))
         else:
             mlog.log.info("Threading enabled")
-            all_nodes_steps = self.generate_node_collection(self.DG)
+            self.worker_pool.check()
+            all_nodes_steps = self.phase_waves()
             self.log_nodes_to_exec(all_nodes_steps)
+            priority = self.node_priorities(graph)
             for nodes_name_collection in all_nodes_steps:
-                with concurrent.futures.ProcessPoolExecutor(max_workers=self.maxworkers) as executor:
-                    list(executor.map(self.do_orchestration, nodes_name_collection,
-                                      itertools.repeat(self.node_loader)))
+                # Nodes of a wave don't depend on each other
+                self.schedule_nodes(
+                    graph.subgraph(nodes_name_collection), priority)
+        self.complete_orchestration()
+
+    def orchestrate_pipeline(self, last_phase):
+        """Orchestrate nodes from the current phase to last_phase.
+
+        A node starts a phase as soon as it completed the previous phase
+        and its dependencies completed this phase."""
+        mlog.log.info(
+            f"Orchestrating nodes (pipelined phases {self.phase}-{last_phase})")
+        self.worker_pool.check()
+        graph = self.phases_pipeline_graph(self.phase, last_phase)
+        nodes = {(node_name, phase): self.node_loader.nodes[node_name]
+                 for node_name, phase in graph}
+        default = self.history.default_duration()
+        durations = {
+            task: self.history.node_duration(
+                task[0], self.node_actions(node, task[1]), default)
+            for task, node in nodes.items()}
+        self.schedule_nodes(graph, critical_path_priorities(graph, durations),
+                            nodes, lambda task: self.node_task(*task))
+        self.complete_orchestration()
+
+    def pipeline_last_phase(self, phase=None):
+        """Get the last phase pipelined with a phase, the current one by default, phases with post-processes are barriers"""
+        if phase is None:
+            phase = self.phase
+        while phase < self.phases and not self.load_processes(phase):
+            phase += 1
+        return phase
+
+    def index_actions(self):
+        """Index the actions of every node per phase, once for the run"""
+        if self.phase_actions is None:
+            actions = dict()  # key:phase, value:dict node name:actions.
+            for phase in range(self.phase, self.phases + 1):
+                actions[phase] = dict()
+                for node_name in self.DG:
+                    node_actions = self.node_actions(
+                        self.node_loader.nodes[node_name], phase)
+                    if node_actions:
+                        actions[phase][node_name] = node_actions
+            self.phase_actions = actions
+        else:
+            # Nodes left out of the graph by the selection
+            self.phase_actions = {
+                phase: {node_name: node_actions
+                        for node_name, node_actions in actions.items()
+                        if node_name in self.DG}
+                for phase, actions in self.phase_actions.items()}
+        self.phase_graphs = dict()
+
+    def phase_graph(self, phase=None):
+        """Get the graph of the nodes with actions in a phase, the current one by default.
+
+        Nodes without actions are left out, their dependents still wait for
+        the nodes they depend on."""
+        if phase is None:
+            phase = self.phase
+        if phase not in self.phase_graphs:
+            self.phase_graphs[phase] = selected_graph(
+                self.DG, set(self.phase_actions.get(phase, {})))
+            mlog.log.info(
+                f"Nodes with actions in phase {phase}: "
+                f"{self.phase_graphs[phase].number_of_nodes()} of {self.DG.number_of_nodes()}")
+        return self.phase_graphs[phase]
+
+    def phase_waves(self, phase=None):
+        """Get the waves of the nodes with actions in a phase, the current one by default"""
+        if phase is None:
+            phase = self.phase
+        if self.planned_waves and phase in self.planned_waves:
+            graph = self.phase_graph(phase)
+            # Nodes left out of the graph by the selection
+            return [wave for wave in (set(wave) & set(graph)
+                                      for wave in self.planned_waves[phase]) if wave]
+        return self.generate_node_collection(self.phase_graph(phase))
+
+    def phases_pipeline_graph(self, first_phase, last_phase):
+        """Get the pipelined graph of the (node, phase) with actions from first_phase to last_phase"""
+        graph = pipeline_graph(self.DG, range(first_phase, last_phase + 1))
+        return selected_graph(graph, set(
+            (node_name, phase) for node_name, phase in graph
+            if node_name in self.phase_actions.get(phase, {})))
+
+    def complete_orchestration(self):
+        """Save durations and report the nodes that failed preflight"""
+        # Keep action durations for the next runs
+        if not self.dryrun:
+            self.history.save()
         # Output nodes_failed_preflight list to mlog.log.error
         if self.nodes_failed_preflight:
             mlog.log.error(
                 "Nodes failed preflight: {}".format(self.nodes_failed_preflight))
 
-    def do_orchestration(self, node_name, node_loader):
-        """Execute node interface"""
-        # Start thread logging if multi-threaded
+    def import_executed_nodes(self):
+        """Import the executed node markers of previous versions with the types of the loaded nodes"""
+        nodes = self.node_loader.nodes
+        environments = set(itertools.chain.from_iterable(
+            node.environments for node in nodes.values()))
+        environments.add(self.environment)
+        self.journal.import_markers(
+            'logs/executed_nodes', environments,
+            {node_name: node.type for node_name, node in nodes.items()})
+
+    def reconcile_inflight(self):
+        """Handle the actions left running by a run that died, before dispatching"""
+        stale = self.journal.stale(self.environment)
+        quarantined = self.journal.actions(self.environment, QUARANTINED)
+        for state in stale:
+            mlog.log.info(
+                f"Interrupted: phase {state['phase']} {state['node']} {state['action']} "
+                f"(pid {state['pid']} on {state['host']})")
+        if self.inflight == 'fail' and (stale or quarantined):
+            mlog.log.error(
+                'Actions interrupted or quarantined, check the nodes and resume with --inflight retry, recheck or quarantine')
+            sys.exit(1)
+        if self.inflight == 'quarantine':
+            for state in stale:
+                self.journal.set_status(state, QUARANTINED)
+            quarantined = quarantined + stale
+        else:
+            # Retry by default, quarantined actions are only released explicitly
+            for state in stale:
+                if self.inflight == 'recheck' and self.recheck_action(state):
+                    continue
+                self.journal.set_status(state, INTERRUPTED)
+            if self.inflight == 'retry':
+                for state in quarantined:
+                    self.journal.set_status(state, INTERRUPTED)
+                quarantined = []
+        # Quarantined nodes are left out until released, with the nodes depending on them
+        quarantined_nodes = set(state['node'] for state in quarantined) & set(self.DG)
+        if quarantined_nodes:
+            dependents = set(itertools.chain.from_iterable(
+                nx.ancestors(self.DG, node_name) for node_name in quarantined_nodes))
+            dependents -= quarantined_nodes
+            mlog.log.info(f"Skipping quarantined nodes: {sorted(quarantined_nodes)}")
+            if dependents:
+                mlog.log.info(
+                    f"Skipping nodes depending on quarantined nodes: {sorted(dependents)}")
+            self.DG.remove_nodes_from(quarantined_nodes | dependents)
+            self.index_actions()
+
+    def recheck_action(self, state):
+        """Run the check action of the node of an interrupted action, mark the action succeeded if it passes"""
+        node = self.node_loader.nodes.get(state['node'])
+        if node is None or node.type not in self.node_interfaces:
+            return False
+        node = Node(**NodeLoader.json_serial(node))
+        node.thread_id = threading.get_ident()
+        node = self.generate_node_environment(node)
+        mlog.log.info(f"Checking node: {node.name}")
+        process = subprocess.run(
+            [self.interface_path(node), 'check', NODE_DATA_STDIN],
+            input=self.prepare_node_data(node), stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True)
+        print(process.stdout, end="")
+        if process.returncode:
+            mlog.log.info(
+                f"Check failed, retrying: phase {state['phase']} {node.name} {state['action']}")
+            return False
+        mlog.log.info(
+            f"Check passed, succeeded: phase {state['phase']} {node.name} {state['action']}")
+        self.journal.finish(node, self.environment, state['phase'], state['action'], 0,
+                            self.node_inputs_hash(node))
+        return True
+
+    def simulation_segments(self):
+        """Get the graphs run one after the other, with their nodes and expected durations"""
+        default = self.history.default_duration()
+        segments = []  # List of (label, graph, nodes, durations, waves).
+        phase = self.phase
+        while phase <= self.phases:
+            waves = None
+            if self.pipeline:
+                last_phase = self.pipeline_last_phase(phase)
+                graph = self.phases_pipeline_graph(phase, last_phase)
+                nodes = {(node_name, node_phase): self.node_loader.nodes[node_name]
+                         for node_name, node_phase in graph}
+                label = f'phases {phase}-{last_phase}'
+                phase = last_phase
+            else:
+                graph = self.phase_graph(phase)
+                nodes = {node_name: self.node_loader.nodes[node_name]
+                         for node_name in graph}
+                label = f'phase {phase}'
+                if self.scheduler == 'waves':
+                    waves = self.phase_waves(phase)
+            durations = {
+                graph_node: self.history.node_duration(
+                    node.name, self.node_actions(
+                        node, graph_node[1] if self.pipeline else phase),
+                    default)
+                for graph_node, node in nodes.items()}
+            segments.append((label, graph, nodes, durations, waves))
+            phase += 1
+        return segments
+
+    def report_simulation(self):
+        """Simulate the phases for every worker count, report the predicted run times"""
+        started = time.monotonic()
+        segments = self.simulation_segments()
+        results = dict()  # key:worker count, value:Simulation.
+        for maxworkers in self.simulate_workers:
+            results[maxworkers] = Simulation(0, 0)
+            for label, graph, nodes, durations, waves in segments:
+                priority = critical_path_priorities(graph, durations)
+                limits = ConcurrencyLimits(self.pools, nodes)
+                if waves and maxworkers > 1:
+                    # Nodes of a wave don't depend on each other
+                    for wave in waves:
+                        results[maxworkers] += simulate(
+                            graph.subgraph(wave), durations, maxworkers, priority, limits)
+                else:
+                    results[maxworkers] += simulate(
+                        graph, durations, maxworkers, priority, limits)
+        mlog.log.info(
+            f"Simulated {len(self.simulate_workers)} worker counts in {time.monotonic() - started:.2f}s, "
+            f"durations in seconds from history ({self.history.default_duration():.1f} for actions without history)")
+        for label, graph, nodes, durations, waves in segments:
+            path, length = critical_path(graph, durations)
+            mlog.log.info(
+                f"Critical path of {label} ({length:.1f}s): {' -> '.join(map(str, path))}")
+        for maxworkers, result in results.items():
+            utilization = result.busy / (result.makespan * maxworkers) if result.makespan else 0
+            # Percent sign as a logger argument, glog formats the message with the arguments
+            mlog.log.info(
+                f"Maxworkers {maxworkers}: makespan {result.makespan:.1f}s, "
+                "worker utilization %d%%", round(utilization * 100))
+        # Fewest workers within 5% of the best run time
+        best = min(result.makespan for result in results.values())
+        suggested = min(maxworkers for maxworkers, result in results.items()
+                        if result.makespan <= best * 1.05)
+        mlog.log.info(f"Suggested maxworkers: {suggested}")
+
+    def report_failed(self):
+        """Log the failed node actions of the environment, of the selected phase if any"""
+        phase = self.phase if self.phase != -1 else None
+        failed = self.journal.actions(self.environment, status=FAILED, phase=phase)
+        for state in failed:
+            finished_at = time.strftime(
+                "%Y%m%d %H:%M:%S", time.localtime(state['finished_at']))
+            mlog.log.info(
+                f"Failed: phase {state['phase']} {state['node_type']} {state['node']} "
+                f"{state['action']} exit code {state['exit_code']} "
+                f"attempts {state['attempts']} at {finished_at}")
+        mlog.log.info(f'Failed node actions: {len(failed)}')
+
+    def node_actions(self, node, phase=None):
+        """Determine this node's actions for the phase, the current phase by default"""
+        if phase is None:
+            phase = self.phase
+        # Actions indexed for the run or compiled in the applied plan
+        if self.phase_actions is not None:
+            return self.phase_actions.get(phase, {}).get(node.name, [])
+        # If we are doing preflight check, only perform preflight
+        if self.preflight:
+            # Execute preflight on node, if not virtual node
+            if node.type == 'Virtual':
+                mlog.log.debug(
+                    f"Skipping preflight for virtual node: {node.name}")
+                return []
+            return ['preflight']
+        # Allow processing of single action, if desired
+        if self.process_single_action:
+            action = self.process_single_action
+            action_phases = node.actions.get(action, {}).get('phases', [])
+            if phase not in action_phases and phase != -1 and not self.force:
+                return []
+            return [action]
+        # See if each action is in this phase
+        return [action for action, phases in node.actions.items()
+                if phase in itertools.chain.from_iterable(phases.values())]
+
+    def schedule_nodes(self, graph, priority, nodes=None, make_task=None):
+        """Run the nodes of a graph on the worker pool, longest remaining chains first
+
+        nodes: optional dict, key:graph node, value:Node, the loaded nodes by default.
+        make_task: optional callable building the task of a graph node, node_task by default.
+        """
+        nodes = nodes or self.node_loader.nodes
+        tasks = {graph_node: (make_task or self.node_task)(graph_node)
+                 for graph_node in graph}
+        # Completed nodes release their dependents without going to a worker
+        completed = self.completed_tasks(tasks)
+        batch_key = None
+        if self.batchsize > 1:
+            # Nodes of the same type running the same actions share interface calls
+            def batch_key(graph_node):
+                task = tasks[graph_node]
+                return task.type, task.phase, tuple(task.actions), graph_node in completed
+
+            def submit(batch):
+                if batch[0] in completed:
+                    return completed_future([None] * len(batch))
+                return self.worker_pool.submit(
+                    self.batch_function(), [tasks[graph_node] for graph_node in batch])
+        else:
+            def submit(graph_node):
+                if graph_node in completed:
+                    return completed_future(None)
+                return self.worker_pool.submit(
+                    self.task_function(), tasks[graph_node])
+        Scheduler(graph, self.maxworkers, priority=priority,
+                  limits=ConcurrencyLimits(self.pools, nodes),
+                  batch_key=batch_key, batch_size=self.batchsize).run(
+            submit,
+            on_complete=lambda graph_node, durations: self.record_durations(
+                tasks[graph_node].name, durations))
+
+    def find_completed_nodes(self):
+        """Find the nodes whose actions of a phase all succeeded with unchanged inputs, once for the run (unforced only)"""
+        self.completed_nodes = set()
+        if self.force or self.dryrun:
+            return
+        recorded = self.journal.succeeded(self.environment)
+        for phase, actions in self.phase_actions.items():
+            for node_name, node_actions in actions.items():
+                keys = [(node_name, phase, action) for action in node_actions]
+                if any(key not in recorded for key in keys):
+                    continue
+                # Nodes recorded before inputs were hashed are kept as processed
+                hashes = set(recorded[key] for key in keys) - {None}
+                if hashes and hashes != {self.node_inputs_hash(self.node_loader.nodes[node_name])}:
+                    continue
+                self.completed_nodes.add((node_name, phase))
+        if self.completed_nodes:
+            mlog.log.info(f"Skipping completed nodes: {len(self.completed_nodes)}")
+
+    def completed_tasks(self, tasks):
+        """Get the graph nodes whose task actions all succeeded with unchanged inputs before the run"""
+        return set(graph_node for graph_node, task in tasks.items()
+                   if (task.name, task.phase) in self.completed_nodes)
+
+    def node_priorities(self, graph):
+        """Rank the nodes of a graph by their longest remaining path in the current phase"""
+        default = self.history.default_duration()
+        durations = {
+            node_name: self.history.node_duration(
+                node_name,
+                self.node_actions(self.node_loader.nodes[node_name]),
+                default)
+            for node_name in graph}
+        return critical_path_priorities(graph, durations)
+
+    def record_durations(self, node_name, durations):
+        """Record the durations of the actions executed for a node"""
+        for action, seconds in (durations or {}).items():
+            self.history.record(node_name, action, seconds)
+
+    def node_task(self, node_name, phase=None):
+        """Build the task sent to a worker for a node, in the current phase by default"""
+        if phase is None:
+            phase = self.phase
+        node = self.node_loader.nodes[node_name]
+        return NodeTask.from_node(node, phase, self.node_actions(node, phase))
+
+    def task_function(self):
+        """Function running the node tasks on the workers of the executor"""
+        if self.executor == 'asyncio':
+            return orchestrate_task_async
+        return orchestrate_task
+
+    def batch_function(self):
+        """Function running batches of node tasks on the workers of the executor"""
+        if self.executor == 'asyncio':
+            return orchestrate_batch_async
+        return orchestrate_batch
+
+    def worker_settings(self):
+        """Settings shared by every node, loaded once per worker"""
+        return {name: getattr(self, name) for name in WORKER_SETTINGS}
+
+    def configure(self, settings):
+        """Load the shared settings"""
+        for name, value in settings.items():
+            setattr(self, name, value)
+
+    def do_orchestration(self, task):
+        """Execute node interface, return the durations of executed actions"""
+        durations = dict()
+        thread_id, thread_log_handler = self.start_task_logging(task)
+        try:
+            node = self.task_node(task, thread_id)
+            if node is None:
+                return
+            for action in task.actions:
+                self.log_action(node, action, task.phase)
+                # Execute node interface based on node type
+                try:
+                    # Lease the action while it runs
+                    with self.action_lease(node, action):
+                        started = time.monotonic()
+                        if self.process_node(node, action, self.dryrun, task.phase):
+                            durations[action] = time.monotonic() - started
+                # Node already started/running
+                except LeaseHeldError:
+                    mlog.log.info(
+                        f"{action} already running for {node.name}")
+        finally:
+            # Stop thread logging if multi-threaded, skipped and failed nodes included
+            if thread_log_handler:
+                stop_thread_logging(thread_log_handler)
+        return durations
+
+    async def do_orchestration_async(self, task):
+        """Execute node interface from the event loop, return the durations of executed actions"""
+        durations = dict()
+        node = self.task_node(task, threading.get_ident())
+        if node is None:
+            return
+        for action in task.actions:
+            self.log_action(node, action, task.phase)
+            # Execute node interface based on node type
+            try:
+                # Lease the action while it runs
+                with self.action_lease(node, action):
+                    started = time.monotonic()
+                    if await self.process_node_async(node, action, self.dryrun, task.phase):
+                        durations[action] = time.monotonic() - started
+            # Node already started/running
+            except LeaseHeldError:
+                mlog.log.info(
+                    f"{action} already running for {node.name}")
+        return durations
+
+    def do_batch_orchestration(self, tasks):
+        """Execute node interface once per action for tasks of the same type and actions, return the durations of every task"""
+        durations = [dict() for _ in tasks]
+        thread_id, thread_log_handler = self.start_task_logging(tasks[0])
+        try:
+            nodes = dict()  # key:task index, value:node.
+            for index, task in enumerate(tasks):
+                node = self.task_node(task, thread_id)
+                if node is not None:
+                    nodes[index] = node
+            for action in tasks[0].actions:
+                with contextlib.ExitStack() as leases:
+                    batch = dict()  # key:task index, value:node.
+                    for index, node in nodes.items():
+                        self.log_action(node, action, tasks[index].phase)
+                        # Lease the action while it runs
+                        try:
+                            leases.enter_context(self.action_lease(node, action))
+                            batch[index] = node
+                        # Node already started/running
+                        except LeaseHeldError:
+                            mlog.log.info(
+                                f"{action} already running for {node.name}")
+                    if not batch:
+                        continue
+                    started = time.monotonic()
+                    executed = self.process_nodes(
+                        list(batch.values()), action, self.dryrun, tasks[0].phase)
+                    for index, node in batch.items():
+                        if node.name in executed:
+                            durations[index][action] = time.monotonic() - started
+        finally:
+            # Stop thread logging if multi-threaded, failed nodes included
+            if thread_log_handler:
+                stop_thread_logging(thread_log_handler)
+        return durations
+
+    def action_lease(self, node, action):
+        """Lease of a running node action, shared by the mudra runs of the host"""
+        return self.leases.lease(lease_name(node.name, action))
+
+    def start_task_logging(self, task):
+        """Start thread logging, get the thread id and the handler to stop if multi-threaded"""
         thread_id = 0
         if self.maxworkers > 1:
             thread_id = threading.get_ident()
         thread_log_handler = start_thread_logging(
-            self.phase, thread_id, self.thread_log_path, self.loglevel)
+            task.phase, thread_id, self.thread_log_path, self.loglevel)
+        if self.maxworkers == 1:
+            return thread_id, None
+        return thread_id, thread_log_handler
+
+    def task_node(self, task, thread_id):
+        """Get the node of a task with its environment, None if the node is skipped"""
         # Begin orchestration
+        node_name = task.name
         mlog.log.debug(f"Evaluating node: {node_name}")
         # Skip node if in skipnodes
         if node_name in self.skipnodes:
             mlog.log.debug(f"Skipping node: {node_name}")
             return
-        # Allow processing of single node, if desired
-        if self.process_single_node and node_name != self.process_single_node:
-            mlog.log.debug(
-                f"Skipping node: {node_name} because it is not the desired node")
-            return
-        elif self.process_multiple_nodes and node_name not in self.process_multiple_nodes:
-            mlog.log.debug(
-                f"Skipping node: {node_name} because it is not in the desired node list")
-            return
         mlog.log.debug(f"Processing node: {node_name}")
         # Get node
-        node = node_loader.nodes.get(node_name)
+        node = task.get_node()
         # Generate node environment
         node.thread_id = thread_id
         node = self.generate_node_environment(node)
         # Output debug information
         mlog.log.debug("Node data: %s" % str(node))
-        # If limiting execution by node type, skip nodes that don't match
-        if self.nodetype and self.nodetype != node.type:
-            mlog.log.debug(
-                f"Skipping node: {node_name} because it is not the desired node type")
-            return
-        mlog.log.debug("Determining node action")
-        # If we are doing preflight check, only perform preflight
+        return node
+
+    def log_action(self, node, action, phase):
+        """Log the action sent to a node"""
         if self.preflight:
-            action = 'preflight'
-            # Execute preflight on node, if not virtual node
-            if node.type == 'Virtual':
-                mlog.log.info(
-                    f"Skipping preflight for virtual node: {node.name}")
-                return
-            else:
-                mlog.log.info(
-                    f"Executing preflight for: {node.name}")
-            try:
-                # Create PID file if start
-                with PidFile(f'{node.name}-preflight') as p:
-                    mlog.log.debug(p.pidname)
-                    self.process_node(node, 'preflight')
-            # Node already started/running
-            except PidFileError as e:
-                mlog.log.info(
-                    f"Preflight already running for {node.name}")
-            return
-        # Allow processing of single action, if desired
-        if self.process_single_action:
-            action = self.process_single_action
-            action_phases = node.actions.get(action, {}).get('phases', [])
-            if self.phase not in action_phases and self.phase != -1 and not self.force:
-                return
-            # Execute node interface based on node type
-            try:
-                # Create PID file if start
-                with PidFile(f'{node.name}-{action}') as p:
-                    mlog.log.debug(p.pidname)
-                    self.process_node(node, action, self.dryrun)
-            # Node already started/running
-            except PidFileError as e:
-                mlog.log.info(
-                    f"{action} already running for {node.name}")
-            return
-        # Determine this node's actions for this current phase
-        for action, phases in node.actions.items():
-            mlog.log.debug(action)
-            node_phases = []
-            for key, value in (
-                    itertools.chain.from_iterable(
-                        [itertools.product((k, ), v) for k, v in phases.items()])):
-                node_phases.append(value)
-            # See if this action is in this phase
-            if self.phase in node_phases:
-                mlog.log.info(f'Sending {action} for phase {self.phase}')
-                # Execute node interface based on node type
-                try:
-                    # Create PID file if start
-                    with PidFile(f'{node.name}-{action}') as p:
-                        mlog.log.debug(p.pidname)
-                        self.process_node(node, action, self.dryrun)
-                # Node already started/running
-                except PidFileError as e:
-                    mlog.log.info(
-                        f"{action} already running for {node.name}")
-        # Stop thread logging if multi-threaded
-        if self.maxworkers > 1:
-            stop_thread_logging(thread_log_handler)
+            mlog.log.info(
+                f"Executing preflight for: {node.name}")
+        else:
+            mlog.log.info(f'Sending {action} for phase {phase}')
 
-    def orchestrate_processes(self):
-        """Orchestrate processes"""
-        mlog.log.info("Orchestrating processes")
-        # Reset processes
-        self.processes = []
-        self.process_loader.processes = []
+    def load_processes(self, phase):
+        """Load the post-processes of a phase"""
+        process_loader = ProcessLoader(self.manifest_cache)
         # Load process files
         try:
             mlog.log.info(
                 f'Getting processes from {self.data_files_directory + "/processes"}')
-            self.process_loader.load(self.data_files_directory + '/processes')
-            self.process_loader.load(
-                self.data_files_directory + f'/processes/Phase {self.phase}')
+            process_loader.load(self.data_files_directory + '/processes')
+            process_loader.load(
+                self.data_files_directory + f'/processes/Phase {phase}')
         except FileNotFoundError as e:
             mlog.log.info(f'Process directory not found (skipping): {e}')
+        return process_loader.processes
+
+    def orchestrate_processes(self):
+        """Orchestrate processes"""
+        mlog.log.info("Orchestrating processes")
         # Iterate through processes and execute commands
-        self.processes = self.process_loader.processes
+        self.processes = self.load_processes(self.phase)
+        self.process_loader.processes = self.processes
         mlog.log.info(f'Processes:{len(self.processes)}')
         if len(self.processes):
-            for process in self.processes:
-                mlog.log.info
-                (process["name"])
-                self.execute_process(process)
+            self.run_processes(self.processes)
+
+    def process_graph(self, processes):
+        """Build the dependency graph of processes, edges from process to dependency.
+
+        Processes run in order by default. A process with `parallel: true`
+        only waits for the processes listed in its `depends_on`.
+        """
+        graph = nx.DiGraph()
+        for index, process in enumerate(processes):
+            process.setdefault("name", f"Process {index + 1}")
+            if process["name"] in graph:
+                raise click.ClickException(
+                    f'Duplicate process name: {process["name"]}')
+            graph.add_node(process["name"])
+        for index, process in enumerate(processes):
+            if process.get("parallel"):
+                dependencies = process.get("depends_on") or []
+                if isinstance(dependencies, str):
+                    dependencies = [dependencies]
+            else:
+                dependencies = [previous["name"] for previous in processes[:index]]
+            for dependency in dependencies:
+                if dependency not in graph:
+                    raise click.ClickException(
+                        f'Process {process["name"]} depends on unknown process: {dependency}')
+                graph.add_edge(process["name"], dependency)
+        if not nx.is_directed_acyclic_graph(graph):
+            raise click.ClickException(
+                f'Cyclic process dependencies: {list(nx.simple_cycles(graph))}')
+        return graph
+
+    def run_processes(self, processes):
+        """Run processes once their dependencies completed, up to maxworkers at once"""
+        graph = self.process_graph(processes)
+        processes = {process["name"]: process for process in processes}
+        # Process commands are subprocesses, threads are enough to wait for them
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.maxworkers, thread_name_prefix='Process') as executor:
+            Scheduler(graph, self.maxworkers).run(
+                lambda name: executor.submit(self.execute_process, processes[name]))
 
     def inspect_missing_dependencies(self):
         """Inspect repeated nodes or missed nodes"""
@@ -538,26 +1189,102 @@ class Mudra:
     def exec(self):
         """Execute"""
         mlog.log.info("Executing orchestration")
-        # Execute phases
-        while self.phase <= self.phases:
-            mlog.log.info(f'Starting phase: {self.phase}')
-            self.orchestrate_nodes()
-            mlog.log.info(f'Phase {self.phase} completed.')
-            # Execute post-processes
-            self.orchestrate_processes()
-            # Increment phase
-            self.phase += 1
+        # Start the worker pool once for every phase
+        if self.maxworkers > 1:
+            self.worker_pool = WorkerPool(
+                self.maxworkers, initializer=init_worker,
+                initargs=(self.worker_settings(), ),
+                backend=self.executor).start()
+        try:
+            # Execute phases
+            while self.phase <= self.phases:
+                if self.pipeline and self.worker_pool:
+                    # Run the phases up to the next post-processes together
+                    last_phase = self.pipeline_last_phase()
+                    mlog.log.info(
+                        f'Starting phases: {self.phase}-{last_phase}')
+                    self.orchestrate_pipeline(last_phase)
+                    self.phase = last_phase
+                else:
+                    mlog.log.info(f'Starting phase: {self.phase}')
+                    self.orchestrate_nodes()
+                mlog.log.info(f'Phase {self.phase} completed.')
+                # Execute post-processes
+                self.orchestrate_processes()
+                # Increment phase
+                self.phase += 1
+        finally:
+            if self.worker_pool:
+                self.worker_pool.shutdown()
+            self.interface_daemons.shutdown()
+            if self.fork_server:
+                self.fork_server.stop()
 
     def setup(self):
         """Setup"""
         mlog.log.info("Setting up")
         # Create thread logger directories
         os.makedirs(self.thread_log_path, exist_ok=True)
-        # Determine phases
+        # Load action durations from previous runs
+        self.history.load()
+        # Load concurrency pools, the command line adds to the data files
+        self.pools = load_pools(
+            self.data_files_directory + '/pools.yaml') + self.pools
+        if self.pools:
+            mlog.log.info(
+                f'Concurrency pools: {", ".join(map(str, self.pools))}')
+        # Load the graph from the applied plan or from the manifests
+        if self.apply_path:
+            self.apply_plan()
+        else:
+            self.build_graph()
+        # Move node tracking of previous versions to the run journal
+        self.import_executed_nodes()
+        # Keep the selected nodes only
+        self.select_graph()
+        # Index the node actions of every phase
+        self.index_actions()
+        # Draw charts
+        if self.drawcharts:
+            self.draw_charts()
+            mlog.log.info('Charts generated')
+        if self.chartsonly:
+            mlog.log.info('Execution completed due to --chartsonly flag')
+            sys.exit(0)
+        # Predict the run time instead of executing
+        if self.simulate_workers:
+            self.report_simulation()
+            sys.exit(0)
+        # Write the plan instead of executing it
+        if self.plan_path:
+            self.save_plan()
+            mlog.log.info('Execution completed due to --plan option')
+            sys.exit(0)
+        # Handle the actions of a run that died
+        if not self.dryrun:
+            self.reconcile_inflight()
+        # Completed nodes of a resumed run release their dependents without being sent
+        self.find_completed_nodes()
+        # Preload the python interfaces in the fork server
+        if self.forkserver:
+            self.start_fork_server()
+
+    def build_graph(self):
+        """Load the manifests and build the validated graph of the environment"""
+        # Load manifest files
+        self.node_loader.load(
+            self.data_files_directory + '/nodes', self.inspect)
+        self.node_loader.set_all_environments(
+            self.data_files_directory + '/environments')
+        # Determine phases, once the manifests are loaded
         if self.force and self.process_single_action:       # Force single action
             # 0 is the preflight and dryrun phase
             self.phase = 0
             self.phases = 0                                 # Force single phase
+        elif self.preflight and self.phase == -1:           # Preflight of every node
+            # 0 is the preflight and dryrun phase
+            self.phase = 0
+            self.phases = 0                                 # Preflight once
         elif self.phase == -1:                              # Default to all phases
             self.phases = self.node_loader.find_phases()    # Find phases
             self.phase = 1                                  # Start at phase 1
@@ -567,11 +1294,6 @@ class Mudra:
             self.phases = 0                                 # Force single phase
         else:                                               # Single phase
             self.phases = self.phase                        # Force single phase
-        # Load manifest files
-        self.node_loader.load(
-            self.data_files_directory + '/nodes', self.inspect)
-        self.node_loader.set_all_environments(
-            self.data_files_directory + '/environments')
         # Inspect the data
         if self.inspect:
             # Inspect dependencies and isolated conflicts in nodes
@@ -599,25 +1321,118 @@ class Mudra:
             self.DG, self.environment)
         # Inspect graph
         self.inspect_graph()
-        # Draw charts
-        if self.drawcharts:
-            self.draw_charts()
-            mlog.log.info('Charts generated')
-        if self.chartsonly:
-            mlog.log.info('Execution completed due to --chartsonly flag')
-            sys.exit(0)
+
+    def select_graph(self):
+        """Reduce the graph to the nodes selected by name, type and filter, without the skipped nodes"""
+        names = self.process_multiple_nodes or []
+        if self.process_single_node:
+            names = names + [self.process_single_node]
+        if not (names or self.nodetype or self.process_node_filter or self.skipnodes):
+            return
+        selected = select_nodes(
+            self.DG, self.node_loader.nodes, names=names,
+            node_type=self.nodetype, node_filter=self.process_node_filter,
+            ancestors=self.select_ancestors, descendants=self.select_descendants)
+        selected -= set(self.skipnodes)
+        self.DG = selected_graph(self.DG, selected)
+        mlog.log.info(f"Selected nodes: {self.DG.number_of_nodes()}")
+
+    def compile_plan(self):
+        """Build the plan of the validated graph, with node actions and waves per phase"""
+        return dict(
+            fingerprint=fingerprint(self.data_files_directory),
+            data_files_directory=self.data_files_directory,
+            settings={name: getattr(self, name) for name in PLAN_SETTINGS + PLAN_FLAGS},
+            nodes=[NodeLoader.json_serial(self.node_loader.nodes[node_name])
+                   for node_name in self.DG],
+            edges=list(self.DG.edges()),
+            actions=self.phase_actions,
+            waves={phase: [sorted(wave) for wave in self.phase_waves(phase)]
+                   for phase in self.phase_actions})
+
+    def save_plan(self):
+        """Write the plan file"""
+        write_plan(self.plan_path, self.compile_plan())
+
+    def apply_plan(self):
+        """Load the graph, node actions and settings of a plan, skipping manifests and validations"""
+        mlog.log.info(f"Applying plan: {self.apply_path}")
+        plan = read_plan(self.apply_path)
+        self.data_files_directory = plan['data_files_directory']
+        # Run-time flags come from the command line, --dryrun included
+        for name in PLAN_FLAGS:
+            if plan['settings'][name] != getattr(self, name):
+                raise click.ClickException(
+                    f"Plan {self.apply_path} was compiled with {name} {plan['settings'][name]}, "
+                    f"apply it with the same --{name} option")
+        self.configure({name: plan['settings'][name] for name in PLAN_SETTINGS})
+        mlog.log.info(
+            f"Plan environment: {self.environment}, phases {self.phase}-{self.phases}")
+        self.node_loader.nodes = {node['name']: Node(**node)
+                                  for node in plan['nodes']}
+        self.DG = nx.DiGraph()
+        self.DG.add_nodes_from(self.node_loader.nodes)
+        self.DG.add_edges_from(plan['edges'])
+        # JSON keys are strings
+        self.phase_actions = {int(phase): actions
+                              for phase, actions in plan['actions'].items()}
+        self.planned_waves = {int(phase): waves
+                              for phase, waves in plan['waves'].items()}
+        self.inspect_graph()
+
+    def start_fork_server(self):
+        """Start the fork server with every python interface"""
+        interface_files = [
+            name + extension for name, extension in self.node_interfaces.items()
+            if extension == '.py' and not name.startswith('if_')]
+        self.fork_server = ForkServer(
+            self.node_interfaces_directory, interface_files).start()
 
 
 app = Mudra()
 
 
+def completed_future(result):
+    """Future already resolved with result"""
+    future = concurrent.futures.Future()
+    future.set_result(result)
+    return future
+
+
+def init_worker(settings):
+    """Load the shared settings once per worker"""
+    app.configure(settings)
+
+
+def orchestrate_task(task):
+    """Orchestrate a node task on a worker"""
+    return app.do_orchestration(task)
+
+
+async def orchestrate_task_async(task):
+    """Orchestrate a node task on the event loop"""
+    return await app.do_orchestration_async(task)
+
+
+def orchestrate_batch(tasks):
+    """Orchestrate a batch of node tasks on a worker"""
+    return app.do_batch_orchestration(tasks)
+
+
+async def orchestrate_batch_async(tasks):
+    """Orchestrate a batch of node tasks from the event loop"""
+    # Batches are sent to the interfaces in one blocking call
+    return await asyncio.get_running_loop().run_in_executor(
+        None, app.do_batch_orchestration, tasks)
+
+
 @click.command()
 @click.option('--phase', default=-1, help='phase to execute')
 @click.option('--environment', default='', help='environment to execute against')
 @click.option('--datafiles', default='', help='data files location (relative)')
 @click.option('--node', default=None, help='process single node, by name')
 @click.option('--nodes', default=None, help='process multiple nodes, by comma-separated names')
-@click.option('--nodefilter', default=None, help='process multiple nodes, based on filter text')
+@click.option('--nodefilter', default=None, help='process the nodes matching a filter, e.g. type=App,meta.K8S_TARGET_NAMESPACE=default')
 @click.option('--action', default=None, help='filters a single action on all nodes, by name')
 @click.option('--extravars', default=None, help='pass in extra environment variables at runtime')
 # @click.option('--extravars', default=None, cls=Click_Formatter, help='pass in extra environment variables at runtime')
@@ -631,13 +1446,27 @@ app = Mudra()
 @click.option('--gettree', default=False, is_flag=True, help="report values from dependency tree walk")
 # @click.option('--gettree', is_flag=True, cls=Click_Formatter, help="report values from dependency tree walk")
 @click.option('--nodetype', default=None, help='processes only this node type')
+@click.option('--ancestors', default=False, is_flag=True, help='also process the nodes depending on the selected nodes')
+@click.option('--descendants', default=False, is_flag=True, help='also process the nodes the selected nodes depend on')
 @click.option('--maxworkers', default=1, help='Number of workers for parallel execution')
+@click.option('--scheduler', default='waves', type=click.Choice(['waves', 'ready']), help='Parallel scheduling mode (Default: waves)')
+@click.option('--executor', default='process', type=click.Choice(EXECUTORS), help='Parallel executor backend (Default: process)')
+@click.option('--pool', 'pools', multiple=True, help='Limit concurrent nodes by type, meta field or label, e.g. type:Database=4 (repeatable)')
+@click.option('--pipeline', default=False, is_flag=True, help='start the next phase of a node without waiting for the other nodes, phases with post-processes are barriers')
+@click.option('--forkserver', default=False, is_flag=True, help='fork node-interface actions from a server with the interfaces preloaded')
+@click.option('--daemons', default=False, is_flag=True, help='run node-interfaces as long-lived daemons instead of one process per action')
+@click.option('--batchsize', default=1, help='Maximum number of ready nodes of the same type and actions sent together to their interface (Default: 1, no batching)')
 @click.option('--logprojectname', default=None, help='Set cloud logging project name')
 @click.option('--threadlogpath', default='logs/thread_logs', help='Where to store thread logs')
 @click.option('--restart', default=False, is_flag=True, help='Used to restart the node tracking')
+@click.option('--simulate', default=None, help='predict the run time for worker counts such as 1-8,16,32 instead of executing')
+@click.option('--plan', 'plan_path', default=None, help='write the validated schedule to a plan file instead of executing it')
+@click.option('--apply', 'apply_path', default=None, help='execute a plan file, without loading and validating the manifests again')
+@click.option('--inflight', default=None, type=click.Choice(['retry', 'recheck', 'quarantine', 'fail']), help='handle the actions left running by a run that died (Default: retry, quarantined nodes stay skipped until --inflight retry)')
+@click.option('--failed', default=False, is_flag=True, help='list the failed node actions of the environment (and --phase) from the run journal, then exit')
 @click.option('--skipnodes', default=None, help='Skip nodes by name (comma-separated list)')
 @click.argument("args", nargs=-1)
-def cli(phase, environment, datafiles, node, nodes, nodefilter, action, extravars, preflight, dryrun, chartsonly, drawcharts, force, inspect, gettree, loglevel, nodetype, maxworkers, logprojectname, threadlogpath, restart, skipnodes, args):
+def cli(phase, environment, datafiles, node, nodes, nodefilter, action, extravars, preflight, dryrun, chartsonly, drawcharts, force, inspect, gettree, loglevel, nodetype, ancestors, descendants, maxworkers, scheduler, executor, pools, pipeline, forkserver, daemons, batchsize, logprojectname, threadlogpath, restart, simulate, plan_path, apply_path, inflight, failed, skipnodes, args):
     # Restart .meta folder
     # if os.path.exists('.meta'):
     #     shutil.rmtree('.meta')
@@ -660,18 +1489,29 @@ def cli(phase, environment, datafiles, node, nodes, nodefilter, action, extravar
     # Restart node tracking
     if restart:
         app.mlog.log.info('Restarting execution from first node')
-        # Delete node tracking directories
+        # Forget the node actions of previous runs
+        app.journal.reset()
+        # Delete node tracking directories of previous versions
         if os.path.exists('logs/executed_nodes'):
             shutil.rmtree('logs/executed_nodes')
         if os.path.exists('logs/failed_preflight'):
             shutil.rmtree('logs/failed_preflight')
     else:
         app.mlog.log.info('Resuming exeuction from last successful node')
-    # Ensure node tracking directories exists
-    if not os.path.exists('logs/executed_nodes'):
-        os.makedirs('logs/executed_nodes')
-    if not os.path.exists('logs/failed_preflight'):
-        os.makedirs('logs/failed_preflight')
+    # Set simulated worker counts
+    if simulate:
+        app.simulate_workers = parse_worker_counts(simulate)
+        app.mlog.log.info(f'Simulate maxworkers: {app.simulate_workers}')
+    # Set plan file to write or to apply
+    app.plan_path = plan_path
+    app.apply_path = apply_path
+    if app.plan_path:
+        app.mlog.log.info(f'Plan: {app.plan_path}')
+    if app.apply_path:
+        app.mlog.log.info(f'Apply: {app.apply_path}')
+    # Set in-flight actions handling
+    app.inflight = inflight
+    app.mlog.log.info(f'In-flight actions: {app.inflight or "retry"}')
     # Configure skipnodes
     if skipnodes:
         app.skipnodes = skipnodes.split(',')
@@ -697,6 +1537,26 @@ def cli(phase, environment, datafiles, node, nodes, nodefilter, action, extravar
     # Set max workers
     app.maxworkers = maxworkers
     app.mlog.log.info(f'Maxworkers: {app.maxworkers}')
+    # Set scheduler
+    app.scheduler = scheduler
+    app.mlog.log.info(f'Scheduler: {app.scheduler}')
+    # Set executor
+    app.executor = executor
+    app.mlog.log.info(f'Executor: {app.executor}')
+    # Set concurrency pools
+    app.pools = [ConcurrencyPool.parse(pool) for pool in pools]
+    # Set pipeline
+    app.pipeline = pipeline
+    app.mlog.log.info(f'Pipeline: {app.pipeline}')
+    # Set fork server
+    app.forkserver = forkserver
+    app.mlog.log.info(f'Fork server: {app.forkserver}')
+    # Set interface daemons
+    app.daemons = daemons
+    app.mlog.log.info(f'Daemons: {app.daemons}')
+    # Set batch size
+    app.batchsize = batchsize
+    app.mlog.log.info(f'Batch size: {app.batchsize}')
     # Set gettree
     app.gettree = gettree
     app.args = args
@@ -717,6 +1577,11 @@ def cli(phase, environment, datafiles, node, nodes, nodefilter, action, extravar
     app.mlog.log.info(f'Process single action: {app.process_single_action}')
     # Set nodetype
     app.nodetype = nodetype
+    # Set selection closure
+    app.select_ancestors = ancestors
+    app.select_descendants = descendants
+    if ancestors or descendants:
+        app.mlog.log.info(f'Select ancestors: {ancestors}, descendants: {descendants}')
     if app.gettree:
         app.inspect_tree()
         sys.exit(0)
@@ -743,6 +1608,10 @@ def cli(phase, environment, datafiles, node, nodes, nodefilter, action, extravar
             app.node_loader.virtualize_missing_dependencies = True
     # Set phase
     app.phase = phase
+    # List failed node actions
+    if failed:
+        app.report_failed()
+        sys.exit(0)
     # Setup Mudra
     app.setup()
     # Log phase
@@ -1,32 +1,55 @@
 """Nodes classes.
 
 Nodes classes for dependencies and interfaces."""
+import sys
 from itertools import chain
 
 
 class Node:
-    """Graph node."""
+    """Graph node.
+
+    Nodes have no per-instance dict, and their names, types, environments
+    and dependency names are interned: the thousands of nodes referencing
+    the same node or environment share a single string."""
+    __slots__ = ('name', 'type', 'parents', 'dependencies', 'meta',
+                 'file_name', 'actions', 'produces', 'environments', 'labels',
+                 'thread_id', 'env')
 
     def __init__(self, name, type, dependencies=None, meta=None, file_name='',
-                 actions=None, produces=None, environments=None, parents=None):
+                 actions=None, produces=None, environments=None, parents=None,
+                 labels=None):
         """Initialize graph node.
 
         name: string name of node
         dependencies: string list of nodes.
         type: string, type of service.
+        labels: string list, concurrency pools of the node.
         """
-        self.name = name
-        self.type = type
-        self.parents = parents or {}
-        self.dependencies = dependencies or {}
+        self.name = intern_name(name)
+        self.type = intern_name(type)
+        self.parents = {intern_name(parent): value
+                        for parent, value in (parents or {}).items()}
+        self.dependencies = {intern_name(dependency_type): intern_references(dependencies_list)
+                             for dependency_type, dependencies_list
+                             in (dependencies or {}).items()}
         self.meta = meta or {}
         self.file_name = file_name
         self.actions = actions or {}
-        self.produces = produces or []
-        self.environments = environments or {}
+        self.produces = intern_references(produces or [])
+        self.environments = {intern_name(environment): value
+                             for environment, value in (environments or {}).items()}
+        self.labels = intern_references(labels or [])
 
     def __str__(self):
-        return str(self.__class__) + ": " + str(self.__dict__)
+        # The environment of the node holds credentials, keep it out of the logs
+        node_data = self.to_dict()
+        node_data.pop('env', None)
+        return str(self.__class__) + ": " + str(node_data)
+
+    def to_dict(self):
+        """Get the attributes of the node, the worker ones when set"""
+        return {attribute: getattr(self, attribute)
+                for attribute in self.__slots__ if hasattr(self, attribute)}
 
     def find_children_by_env(self, selected_env):
         children = set()
@@ -49,3 +72,18 @@ class Node:
             if selected_env in output_node['environments']:
                 children.add(output_node['name'])
         return children
+
+
+def intern_name(value):
+    """Intern a name, values of other types are kept"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def intern_references(references):
+    """Intern the node names of a list of dependencies or output nodes, names or dicts with a name"""
+    if not isinstance(references, list):
+        return references
+    return [{**reference, 'name': intern_name(reference['name'])}
+            if isinstance(reference, dict) and 'name' in reference
+            else intern_name(reference)
+            for reference in references]
@@ -0,0 +1,105 @@
+"""Long-lived node interface processes.
+
+Instead of starting an interpreter for every action, each interface runs
+as a daemon (`<interface> daemon`) taking JSON-RPC requests over stdio,
+interpreter and import startup are paid once per daemon."""
+
+import itertools
+import json
+import subprocess
+import threading
+from collections import defaultdict
+
+import mudra.mlog as mlog
+
+
+class InterfaceDaemonError(Exception):
+    """Interface daemon stopped or answered an invalid response."""
+
+
+class InterfaceDaemon:
+    """Interface process serving one action at a time."""
+
+    def __init__(self, path):
+        """Start the daemon of the interface script at path"""
+        mlog.log.debug(f'Starting interface daemon: {path}')
+        self.path = path
+        self.ids = itertools.count(1)
+        self.process = subprocess.Popen([path, 'daemon'],
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        text=True)
+
+    def call(self, method, *params):
+        """Run an action, get its result"""
+        request_id = next(self.ids)
+        request = dict(jsonrpc='2.0', id=request_id, method=method,
+                       params=list(params))
+        try:
+            self.process.stdin.write(json.dumps(request) + '\n')
+            self.process.stdin.flush()
+            response = json.loads(self.process.stdout.readline())
+        except (OSError, ValueError) as error:
+            raise InterfaceDaemonError(
+                f'{self.path} stopped (exit code {self.process.poll()}): {error}')
+        if 'error' in response or response.get('id') != request_id:
+            raise InterfaceDaemonError(
+                f'{self.path} invalid response: {response}')
+        return response['result']
+
+    def stop(self):
+        """Close the requests stream, the daemon exits"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+
+
+class InterfaceDaemons:
+    """Daemons of every interface, one per concurrent action."""
+
+    def __init__(self):
+        """Initialize."""
+        self.idle = defaultdict(list)  # key:interface path, value:daemons.
+        self.lock = threading.Lock()
+
+    def acquire(self, path):
+        """Get an idle daemon of an interface, start one if none"""
+        with self.lock:
+            if self.idle[path]:
+                return self.idle[path].pop()
+        return InterfaceDaemon(path)
+
+    def release(self, daemon):
+        """Make a daemon available for the next actions"""
+        with self.lock:
+            self.idle[daemon.path].append(daemon)
+
+    def request(self, path, method, *params):
+        """Send a request to a daemon of an interface, get its result"""
+        daemon = self.acquire(path)
+        try:
+            result = daemon.call(method, *params)
+        except InterfaceDaemonError:
+            daemon.stop()
+            raise
+        self.release(daemon)
+        return result
+
+    def call(self, path, method, *params):
+        """Run an action of an interface, get its exit code and output"""
+        try:
+            result = self.request(path, method, *params)
+        except InterfaceDaemonError as error:
+            return 1, f'{error}\n'
+        return result['exit_code'], result['output']
+
+    def shutdown(self):
+        """Stop every idle daemon"""
+        with self.lock:
+            daemons = [daemon for daemons in self.idle.values()
+                       for daemon in daemons]
+            self.idle.clear()
+        for daemon in daemons:
+            daemon.stop()
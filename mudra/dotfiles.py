@@ -0,0 +1,47 @@
+"""Dotfiles of the environments and nodes, parsed once per change.
+
+Every node action reads the same environment meta, credentials and
+extravars files, with the meta and credentials of its node on top. The
+parsed values of each file are kept with its modification time and size,
+so a file is only parsed again once it changed."""
+
+import os
+import stat
+import threading
+
+from dotenv.main import dotenv_values
+
+import mudra.mlog as mlog
+
+
+class DotfileCache:
+    """Parsed values of the dotfiles read by the run."""
+
+    def __init__(self):
+        """Initialize."""
+        self.dotfiles = dict()  # key:path, value:tuple (mtime, size, values).
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        return dict()
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def load(self, path):
+        """Get the values of a dotfile, empty if missing, the returned dict is shared"""
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return {}
+        if not stat.S_ISREG(file_stat.st_mode):
+            return {}
+        with self.lock:
+            cached = self.dotfiles.get(path)
+        if cached and cached[:2] == (file_stat.st_mtime_ns, file_stat.st_size):
+            return cached[2]
+        mlog.log.debug(f"Parsing dotfile: {path}")
+        values = dotenv_values(path)
+        with self.lock:
+            self.dotfiles[path] = (file_stat.st_mtime_ns, file_stat.st_size, values)
+        return values
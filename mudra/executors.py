@@ -0,0 +1,107 @@
+"""Executor backends running the node tasks.
+
+Node actions are subprocesses, the workers mostly wait for them. Besides
+worker processes, tasks can run on threads or as coroutines of a single
+event loop driving every interface subprocess."""
+
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+
+
+EXECUTORS = ('process', 'thread', 'asyncio')
+
+
+class AsyncioExecutor:
+    """Run tasks as coroutines of an event loop in a background thread.
+
+    Follows the concurrent.futures.Executor interface, submit returns a
+    concurrent.futures.Future so the schedulers can wait on it."""
+
+    def __init__(self, max_workers, initializer=None, initargs=()):
+        """Initialize.
+
+        max_workers: int, maximum number of tasks running at once.
+        initializer: optional callable run once in the event loop thread.
+        initargs: tuple of arguments for the initializer.
+        """
+        self.max_workers = max_workers
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self._run_loop, args=(initializer, initargs),
+            name='AsyncioExecutor', daemon=True)
+        self.thread.start()
+        self.semaphore = self._call(self._create_semaphore).result()
+
+    def _run_loop(self, initializer, initargs):
+        asyncio.set_event_loop(self.loop)
+        if initializer:
+            initializer(*initargs)
+        self.loop.run_forever()
+        self.loop.close()
+
+    def _call(self, fn, *args):
+        """Run fn(*args) in the loop thread"""
+        return asyncio.run_coroutine_threadsafe(fn(*args), self.loop)
+
+    async def _create_semaphore(self):
+        # Bound to the running loop on Python < 3.10
+        return asyncio.Semaphore(self.max_workers)
+
+    async def _run(self, future, fn, args):
+        """Run a task and resolve its future"""
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            async with self.semaphore:
+                result = fn(*args)
+                if inspect.isawaitable(result):
+                    result = await result
+        # SystemExit from a task stops the caller, not the event loop
+        except BaseException as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def submit(self, fn, *args):
+        """Schedule fn(*args), fn can be a coroutine function"""
+        future = concurrent.futures.Future()
+        self.loop.call_soon_threadsafe(
+            self.loop.create_task, self._run(future, fn, args))
+        return future
+
+    def map(self, fn, *iterables):
+        """Run fn over the iterables, results in submission order"""
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        return (future.result() for future in futures)
+
+    def shutdown(self, wait=True):
+        """Stop the event loop, waiting for the running tasks if wait"""
+        if not self.loop.is_running():
+            return
+        if wait:
+            self._call(self._drain).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if wait:
+            self.thread.join()
+
+    async def _drain(self):
+        """Wait for the tasks still running in the loop"""
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_executor(backend, max_workers, initializer=None, initargs=()):
+    """Create the executor of a backend"""
+    if backend == 'process':
+        executor_class = concurrent.futures.ProcessPoolExecutor
+    elif backend == 'thread':
+        executor_class = concurrent.futures.ThreadPoolExecutor
+    elif backend == 'asyncio':
+        executor_class = AsyncioExecutor
+    else:
+        raise ValueError(f'Unknown executor backend: {backend}')
+    return executor_class(max_workers=max_workers, initializer=initializer,
+                          initargs=initargs)
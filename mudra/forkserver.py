@@ -0,0 +1,92 @@
+"""Fork server preloading the node interfaces.
+
+Starting an interpreter and importing click, kubernetes and the interface
+module costs more than most actions. The fork server
+(node_interfaces/if_forkserver.py) imports every interface once at setup,
+then forks a ready child for each action."""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+import mudra.mlog as mlog
+
+
+SERVER_SCRIPT = 'if_forkserver.py'
+
+
+class ForkServer:
+    """Client of the fork server, shared with the workers."""
+
+    def __init__(self, interfaces_directory, interface_files):
+        """Initialize.
+
+        interfaces_directory: str, directory of the node interfaces.
+        interface_files: list of str, python interfaces to preload.
+        """
+        self.interfaces_directory = interfaces_directory
+        self.interface_files = interface_files
+        self.interfaces = set()  # Interfaces preloaded by the server.
+        self.socket_path = None
+        self.process = None
+
+    def __getstate__(self):
+        # Workers only connect to the server started by the main process
+        state = self.__dict__.copy()
+        state['process'] = None
+        return state
+
+    def start(self):
+        """Start the server, wait for the interfaces to be preloaded"""
+        self.socket_path = os.path.join(
+            tempfile.mkdtemp(prefix='mudra-forkserver-'), 'socket')
+        paths = [os.path.join(self.interfaces_directory, interface_file)
+                 for interface_file in self.interface_files]
+        mlog.log.debug(f'Starting fork server: {self.socket_path}')
+        self.process = subprocess.Popen(
+            [os.path.join(self.interfaces_directory, SERVER_SCRIPT),
+             self.socket_path, *paths],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            ready = json.loads(self.process.stdout.readline())
+        except ValueError:
+            ready = dict(interfaces=[])
+        self.interfaces = set(ready['interfaces'])
+        mlog.log.info(
+            f'Fork server preloaded: {", ".join(sorted(self.interfaces)) or "none"}')
+        return self
+
+    def run(self, interface, action, *params):
+        """Run an action in a forked child, get its exit code and output"""
+        request = dict(interface=interface, action=action, params=list(params))
+        output = []
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.connect(self.socket_path)
+                conn.sendall((json.dumps(request) + '\n').encode())
+                with conn.makefile('r', encoding='utf-8', errors='replace') as lines:
+                    for line in lines:
+                        output.append(line)
+                        # Exit code follows the NUL character
+                        print(line.partition('\0')[0], end="")
+        except OSError as error:
+            return 1, f'Fork server unavailable: {error}\n'
+        output, _, exit_code = ''.join(output).rpartition('\0')
+        if not exit_code.isdigit():
+            return 1, output + exit_code + '\nFork server stopped\n'
+        return int(exit_code), output
+
+    def stop(self):
+        """Close the server stdin, the server exits"""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        shutil.rmtree(os.path.dirname(self.socket_path), ignore_errors=True)
+        self.process = None
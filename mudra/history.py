@@ -0,0 +1,63 @@
+"""Durations of node actions recorded from previous runs."""
+
+import json
+import os
+
+import mudra.mlog as mlog
+
+
+# Unit duration of an action without history, as assumed by charts.generate
+DEFAULT_DURATION = 1
+# Weight of the latest run in the recorded average
+SMOOTHING = 0.5
+
+
+class DurationHistory:
+    """Average duration in seconds of every node action."""
+
+    def __init__(self, path='logs/durations.json'):
+        """Initialize."""
+        self.path = path
+        self.durations = dict()  # key:node name, value:dict action:seconds.
+
+    def load(self):
+        """Load durations from previous runs"""
+        if not os.path.isfile(self.path):
+            mlog.log.debug(f'No duration history found in {self.path}')
+            return self
+        try:
+            with open(self.path, 'r') as history_file:
+                self.durations = json.load(history_file)
+        except ValueError as error:
+            mlog.log.error(f'Ignoring invalid duration history: {error}')
+        return self
+
+    def save(self):
+        """Save durations, replacing the history file atomically"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as history_file:
+            json.dump(self.durations, history_file)
+        os.replace(temp_path, self.path)
+
+    def record(self, node_name, action, seconds):
+        """Record the duration of an executed action"""
+        actions = self.durations.setdefault(node_name, {})
+        if action in actions:
+            seconds = SMOOTHING * seconds + (1 - SMOOTHING) * actions[action]
+        actions[action] = round(seconds, 3)
+
+    def default_duration(self):
+        """Duration of actions never executed"""
+        known = [seconds for actions in self.durations.values()
+                 for seconds in actions.values()]
+        if not known:
+            return DEFAULT_DURATION
+        return sum(known) / len(known)
+
+    def node_duration(self, node_name, actions, default=None):
+        """Expected duration of the node actions"""
+        if default is None:
+            default = self.default_duration()
+        node_durations = self.durations.get(node_name, {})
+        return sum(node_durations.get(action, default) for action in actions)
@@ -0,0 +1,265 @@
+"""Run state of every node action, kept in a SQLite journal.
+
+One row per node, environment, phase and action records its status,
+the hash of its inputs, exit code, attempts and timestamps. The journal
+runs in WAL mode, so the workers of every executor record their actions
+concurrently while the main process reads them.
+
+Actions still running when the orchestrator died keep the host and pid
+that ran them, a resumed run reconciles them before dispatching. The
+leases of the running actions are kept in the same database."""
+
+import contextlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+import mudra.mlog as mlog
+
+
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+# In-flight actions of a run that died
+INTERRUPTED = 'interrupted'
+QUARANTINED = 'quarantined'
+
+# Seconds a writer waits for the lock held by another worker
+BUSY_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    node TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    phase INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    node_type TEXT,
+    status TEXT NOT NULL,
+    inputs_hash TEXT,
+    exit_code INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    started_at REAL,
+    finished_at REAL,
+    host TEXT,
+    pid INTEGER,
+    PRIMARY KEY (node, environment, phase, action)
+);
+CREATE INDEX IF NOT EXISTS actions_status
+    ON actions (environment, status, phase);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+# Columns added after the first version of the journal
+ADDED_COLUMNS = {'host': 'TEXT', 'pid': 'INTEGER'}
+
+
+class RunJournal:
+    """Status of the node actions of every run."""
+
+    def __init__(self, path='logs/run_state.db'):
+        """Initialize."""
+        self.path = path
+        # Connections can't be shared by threads or forked processes
+        self.local = threading.local()
+
+    def __getstate__(self):
+        return dict(path=self.path)
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    @property
+    def connection(self):
+        """Connection of the current thread and process"""
+        pid = os.getpid()
+        if getattr(self.local, 'pid', None) != pid:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self.add_columns(connection)
+            self.local.connection = connection
+            self.local.pid = pid
+        return self.local.connection
+
+    @staticmethod
+    def add_columns(connection):
+        """Add the columns missing from a journal of a previous version"""
+        columns = set(row['name'] for row in
+                      connection.execute('PRAGMA table_info(actions)'))
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in columns:
+                connection.execute(
+                    f'ALTER TABLE actions ADD COLUMN {column} {column_type}')
+
+    def lookup(self, node_name, environment, phase, action):
+        """Get the state of a node action, None if never executed"""
+        return self.connection.execute(
+            'SELECT * FROM actions WHERE node = ? AND environment = ? '
+            'AND phase = ? AND action = ?',
+            (node_name, environment, phase, action)).fetchone()
+
+    def start(self, node, environment, phase, action):
+        """Record the start of a node action attempt by this process"""
+        self.connection.execute(
+            'INSERT INTO actions (node, environment, phase, action, node_type, '
+            'status, attempts, started_at, host, pid) '
+            'VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?) '
+            'ON CONFLICT (node, environment, phase, action) DO UPDATE SET '
+            'status = excluded.status, attempts = attempts + 1, '
+            'started_at = excluded.started_at, finished_at = NULL, '
+            'exit_code = NULL, host = excluded.host, pid = excluded.pid',
+            (node.name, environment, phase, action, node.type, RUNNING,
+             time.time(), socket.gethostname(), os.getpid()))
+
+    def finish(self, node, environment, phase, action, exit_code,
+               inputs_hash=None):
+        """Record the end of a node action, succeeded with exit code 0"""
+        status = FAILED if exit_code else SUCCEEDED
+        now = time.time()
+        self.connection.execute(
+            'INSERT INTO actions (node, environment, phase, action, node_type, '
+            'status, inputs_hash, exit_code, attempts, started_at, finished_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?) '
+            'ON CONFLICT (node, environment, phase, action) DO UPDATE SET '
+            'status = excluded.status, exit_code = excluded.exit_code, '
+            'inputs_hash = COALESCE(excluded.inputs_hash, inputs_hash), '
+            'finished_at = excluded.finished_at',
+            (node.name, environment, phase, action, node.type, status,
+             inputs_hash, exit_code, now, now))
+
+    def set_status(self, state, status):
+        """Change the status of a node action"""
+        self.connection.execute(
+            'UPDATE actions SET status = ? WHERE node = ? AND environment = ? '
+            'AND phase = ? AND action = ?',
+            (status, state['node'], state['environment'], state['phase'],
+             state['action']))
+
+    def succeeded(self, environment):
+        """Get the inputs hash of the succeeded actions by (node, phase, action)"""
+        return {(state['node'], state['phase'], state['action']): state['inputs_hash']
+                for state in self.actions(environment, SUCCEEDED)}
+
+    def actions(self, environment, status=None, phase=None, action=None):
+        """Get the node actions of an environment, optionally filtered"""
+        query = 'SELECT * FROM actions WHERE environment = ?'
+        params = [environment]
+        for column, value in (('status', status), ('phase', phase),
+                              ('action', action)):
+            if value is not None:
+                query += f' AND {column} = ?'
+                params.append(value)
+        return self.connection.execute(
+            query + ' ORDER BY phase, finished_at', params).fetchall()
+
+    def stale(self, environment):
+        """Get the running actions whose process is gone.
+
+        The processes of this host are checked, the actions of other hosts
+        are stale once their lease expired.
+        """
+        host = socket.gethostname()
+        leased = set(tuple(lease) for lease in self.connection.execute(
+            'SELECT name, host, pid FROM leases WHERE expires_at > ?',
+            (time.time(),)))
+        stale = []
+        for state in self.actions(environment, RUNNING):
+            if state['host'] == host:
+                if not process_alive(state['pid']):
+                    stale.append(state)
+            elif (lease_name(state['node'], state['action']),
+                  state['host'], state['pid']) not in leased:
+                stale.append(state)
+        return stale
+
+    def reset(self):
+        """Forget every node action"""
+        self.connection.execute('DELETE FROM actions')
+
+    def import_markers(self, directory, environments, node_types):
+        """Import the marker files of previous versions, once.
+
+        environments: names of the environments, markers of other
+        environments are kept.
+        node_types: dict, key:node name, value:node type.
+        """
+        if not os.path.isdir(directory):
+            return
+        mlog.log.info(f'Importing executed nodes from {directory}')
+        # Longest names first, an environment name can end with another one
+        environments = sorted(environments, key=len, reverse=True)
+        rows = []
+        imported = []
+        for marker in os.listdir(directory):
+            state = parse_marker(marker, environments, node_types)
+            if state is None:
+                mlog.log.error(f'Keeping marker of an unknown environment: {marker}')
+                continue
+            node_name, environment, phase, action = state
+            path = os.path.join(directory, marker)
+            with open(path, 'r') as f:
+                inputs_hash = f.read().strip() or None
+            rows.append((node_name, environment, phase, action,
+                         node_types.get(node_name), SUCCEEDED, inputs_hash,
+                         os.path.getmtime(path)))
+            imported.append(path)
+        with self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO actions (node, environment, phase, '
+                'action, node_type, status, inputs_hash, exit_code, attempts, '
+                'finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, 0, 1, ?)', rows)
+        for path in imported:
+            os.remove(path)
+        # The directory is kept with the markers not imported
+        with contextlib.suppress(OSError):
+            os.rmdir(directory)
+
+
+def parse_marker(marker, environments, node_types):
+    """Get the (node, environment, phase, action) of a marker, None if not recognized.
+
+    Marker names are {node}-{environment}-{phase}-{action}, node and
+    environment names can contain `-`: the environment is one of the
+    environments, preferably following the name of a known node.
+    """
+    try:
+        prefix, phase, action = marker.rsplit('-', 2)
+        phase = int(phase)
+    except ValueError:
+        return None
+    states = [(prefix[:-len(environment) - 1], environment, phase, action)
+              for environment in environments
+              if prefix.endswith('-' + environment)]
+    for state in states:
+        if state[0] in node_types:
+            return state
+    return states[0] if states else None
+
+def lease_name(node_name, action):
+    """Name of the lease of a node action"""
+    return f'{node_name}-{action}'
+
+
+def process_alive(pid):
+    """Check if a process of this host is running"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
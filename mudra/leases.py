@@ -0,0 +1,114 @@
+"""Leases on running node actions.
+
+A lease in the run journal marks a node action as running, so concurrent
+mudra invocations of the host don't run it twice. Leases are renewed in
+the background while the action runs and expire after their TTL once
+their process is gone, earlier when the process is known dead."""
+
+import contextlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from mudra.journal import process_alive
+
+
+# Seconds a lease lasts without renewal
+LEASE_TTL = 60
+
+
+class LeaseHeldError(Exception):
+    """Node action leased by another run."""
+
+
+class LeaseManager:
+    """Leases held by the current process."""
+
+    def __init__(self, journal, ttl=LEASE_TTL):
+        """Initialize.
+
+        journal: RunJournal, run-state store holding the leases.
+        ttl: int, seconds a lease lasts without renewal.
+        """
+        self.journal = journal
+        self.ttl = ttl
+        self.reset()
+
+    def __getstate__(self):
+        return dict(journal=self.journal, ttl=self.ttl)
+
+    def __setstate__(self, state):
+        self.__init__(state['journal'], state['ttl'])
+
+    def reset(self):
+        """Forget the leases and renewer of another process"""
+        self.pid = os.getpid()
+        self.host = socket.gethostname()
+        self.owner = f'{self.host}:{self.pid}'
+        self.held = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.renewer = None
+
+    def acquire(self, name):
+        """Lease a node action, raise LeaseHeldError if already leased"""
+        if self.pid != os.getpid():
+            # Forked worker
+            self.reset()
+        connection = self.journal.connection
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            lease = connection.execute(
+                'SELECT * FROM leases WHERE name = ?', (name,)).fetchone()
+            if lease and lease['expires_at'] > now and (
+                    lease['host'] != self.host or process_alive(lease['pid'])):
+                raise LeaseHeldError(f'{name} leased by {lease["owner"]}')
+            connection.execute(
+                'INSERT OR REPLACE INTO leases (name, owner, host, pid, expires_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (name, self.owner, self.host, self.pid, now + self.ttl))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        with self.lock:
+            self.held.add(name)
+            if self.renewer is None:
+                self.renewer = threading.Thread(
+                    target=self.renew, name='LeaseRenewer', daemon=True)
+                self.renewer.start()
+
+    def release(self, name):
+        """End the lease of a node action"""
+        with self.lock:
+            self.held.discard(name)
+        self.journal.connection.execute(
+            'DELETE FROM leases WHERE name = ? AND owner = ?',
+            (name, self.owner))
+
+    @contextlib.contextmanager
+    def lease(self, name):
+        """Hold the lease of a node action while running it"""
+        self.acquire(name)
+        try:
+            yield name
+        finally:
+            self.release(name)
+
+    def renew(self):
+        """Extend the held leases until the process exits"""
+        while not self.stopped.wait(self.ttl / 3):
+            with self.lock:
+                names = list(self.held)
+            if not names:
+                continue
+            try:
+                self.journal.connection.executemany(
+                    'UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ?',
+                    [(time.time() + self.ttl, name, self.owner) for name in names])
+            # Busy journal, retry on the next renewal
+            except sqlite3.OperationalError:
+                continue
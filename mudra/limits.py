@@ -0,0 +1,135 @@
+"""Concurrency pools limiting the nodes running at once per backend.
+
+A pool selects nodes by type, by a meta field or by a label, and caps how
+many of the selected nodes run at the same time. Pools keyed by a meta
+field hold one limit per value of the field.
+
+Pools are declared in pools.yaml of the data files directory:
+
+    - type: Database
+      limit: 4
+    - meta: K8S_TARGET_NAMESPACE
+      limit: 10
+    - label: cloudsql-migration
+      limit: 4
+
+or with --pool on the command line: type:Database=4."""
+
+import os
+from collections import Counter
+from typing import NamedTuple
+
+import click
+import yaml
+
+import mudra.mlog as mlog
+
+
+SELECTORS = ('type', 'meta', 'label')
+
+
+class ConcurrencyPool(NamedTuple):
+    """Limit of nodes running at once among the selected nodes."""
+    selector: str
+    value: str
+    limit: int
+
+    def __str__(self):
+        return f'{self.selector}:{self.value}={self.limit}'
+
+    @classmethod
+    def create(cls, selector, value, limit):
+        """Build a validated pool"""
+        if selector not in SELECTORS:
+            raise click.ClickException(
+                f'Invalid pool selector `{selector}`, use one of: {", ".join(SELECTORS)}')
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            limit = 0
+        if limit < 1:
+            raise click.ClickException(
+                f'Invalid limit for pool {selector}:{value}, use a positive integer')
+        return cls(selector, str(value), limit)
+
+    @classmethod
+    def parse(cls, text):
+        """Build a pool from selector:value=limit"""
+        try:
+            key, limit = text.rsplit('=', 1)
+            selector, value = key.split(':', 1)
+        except ValueError:
+            raise click.ClickException(
+                f'Invalid pool `{text}`, expected selector:value=limit')
+        return cls.create(selector, value, limit)
+
+    def key(self, node):
+        """Get the key of the node in this pool, None if not selected"""
+        if self.selector == 'type':
+            return (self.selector, self.value) if node.type == self.value else None
+        if self.selector == 'meta':
+            if self.value not in node.meta:
+                return None
+            return (self.selector, self.value, str(node.meta[self.value]))
+        return (self.selector, self.value) if self.value in node.labels else None
+
+
+def load_pools(input_path):
+    """Load pools from a yaml file, no pools if it doesn't exist"""
+    if not os.path.isfile(input_path):
+        return []
+    mlog.log.debug(f'Loading concurrency pools from {input_path}')
+    with open(input_path, 'r') as file:
+        declared = yaml.load(file.read(), Loader=yaml.SafeLoader) or []
+    pools = []
+    for pool in declared:
+        selectors = [selector for selector in SELECTORS if selector in pool]
+        if len(selectors) != 1:
+            raise click.ClickException(
+                f'Invalid pool in {input_path}: {pool}, use exactly one of: {", ".join(SELECTORS)}')
+        selector = selectors[0]
+        pools.append(ConcurrencyPool.create(
+            selector, pool[selector], pool.get('limit')))
+    return pools
+
+
+class ConcurrencyLimits:
+    """Count the running nodes of every pool."""
+
+    def __init__(self, pools, nodes):
+        """Initialize.
+
+        pools: list of ConcurrencyPool.
+        nodes: dict, key:node name, value:Node.
+        """
+        self.pools = pools
+        self.nodes = nodes
+        self.running = Counter()  # key:pool key, value:running nodes.
+        self.node_keys = dict()  # key:node name, value:list of (key, limit).
+
+    def __bool__(self):
+        return bool(self.pools)
+
+    def keys(self, node_name):
+        """Get the pool keys and limits of a node"""
+        if node_name not in self.node_keys:
+            node = self.nodes[node_name]
+            self.node_keys[node_name] = [
+                (key, pool.limit) for key, pool in
+                ((pool.key(node), pool) for pool in self.pools)
+                if key is not None]
+        return self.node_keys[node_name]
+
+    def acquire(self, node_name):
+        """Take a slot in every pool of the node, False if one is full"""
+        keys = self.keys(node_name)
+        if any(self.running[key] >= limit for key, limit in keys):
+            return False
+        for key, _ in keys:
+            self.running[key] += 1
+        return True
+
+    def release(self, node_name):
+        """Free the slots of the node"""
+        for key, _ in self.keys(node_name):
+            self.running[key] -= 1
@@ -2,6 +2,9 @@
 
 import os
 import click
+import concurrent.futures
+import hashlib
+import pickle
 import yaml
 import sys
 from yaml import parser
@@ -14,37 +17,162 @@ from mudra.components import Node
 import mudra.mlog as mlog
 
 
+# libyaml parser when PyYAML is built with it
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# Fewer manifests are parsed in the current process
+PARALLEL_MIN_MANIFESTS = 200
+# Version of the parsed manifests cache format
+CACHE_VERSION = 1
+# Returned by ManifestCache.get for the files to parse, empty files are cached as None
+CACHE_MISS = object()
+
+
+def parse_manifest(path):
+    """Parse a yaml file, get (data, error, signature)
+
+    signature: tuple (mtime, size, digest) of the parsed content.
+    """
+    with open(path, 'rb') as file:
+        # Stat before reading, a file changed meanwhile gets a new mtime
+        stat = os.fstat(file.fileno())
+        content = file.read()
+    signature = (stat.st_mtime_ns, len(content), hashlib.sha256(content).digest())
+    try:
+        return yaml.load(content, Loader=YAML_LOADER), None, signature
+    except parser.ParserError as err:
+        return None, str(err), signature
+
+
+def parse_manifests(paths, workers=None, cache=None):
+    """Parse yaml files across worker processes, get their (data, error) in the order of paths
+
+    cache: optional ManifestCache, only the files changed since they were cached are parsed.
+    """
+    results = dict()  # key:path, value:tuple (data, error).
+    if cache:
+        for path in paths:
+            data = cache.get(path)
+            if data is not CACHE_MISS:
+                results[path] = (data, None)
+    changed = [path for path in paths if path not in results]
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or len(changed) < PARALLEL_MIN_MANIFESTS:
+        parsed = [parse_manifest(path) for path in changed]
+    else:
+        # A few chunks per worker to balance large and small files
+        chunksize = max(1, len(changed) // (workers * 4))
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            parsed = list(executor.map(parse_manifest, changed, chunksize=chunksize))
+    for path, (data, error, signature) in zip(changed, parsed):
+        if cache and not error:
+            cache.put(path, data, signature)
+        results[path] = (data, error)
+    if cache:
+        mlog.log.debug(f'Parsed {len(changed)} of {len(paths)} manifests, the others are cached')
+        cache.save()
+    return [results[path] for path in paths]
+
+
+class ManifestCache:
+    """Parsed yaml files kept across runs, by path, modification time, size and content hash."""
+
+    def __init__(self, path='logs/manifest_cache.pickle'):
+        """Initialize."""
+        self.path = path
+        self.entries = None  # key:file path, value:tuple (mtime, size, digest, pickled data).
+        self.changed = False
+
+    def load(self):
+        """Load the cache of the previous runs, once"""
+        if self.entries is not None:
+            return self
+        self.entries = dict()
+        try:
+            with open(self.path, 'rb') as cache_file:
+                version, entries = pickle.load(cache_file)
+            if version == CACHE_VERSION:
+                self.entries = entries
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError) as error:
+            mlog.log.error(f'Ignoring invalid manifest cache: {error}')
+        return self
+
+    def save(self):
+        """Save the changed cache, replacing the cache file atomically"""
+        if not self.changed:
+            return
+        # Forget the files removed since they were cached
+        self.entries = {path: entry for path, entry in self.entries.items()
+                        if os.path.exists(path)}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as cache_file:
+            pickle.dump((CACHE_VERSION, self.entries), cache_file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+        self.changed = False
+
+    def get(self, path):
+        """Get a fresh copy of the parsed data of an unchanged file, CACHE_MISS if changed or not cached"""
+        entry = self.load().entries.get(path)
+        if entry is None:
+            return CACHE_MISS
+        mtime, size, digest, data = entry
+        stat = os.stat(path)
+        if (stat.st_mtime_ns, stat.st_size) != (mtime, size):
+            # Touched files keep their entry while their content is the same
+            if stat.st_size != size or file_digest(path) != digest:
+                return CACHE_MISS
+            self.entries[path] = (stat.st_mtime_ns, size, digest, data)
+            self.changed = True
+        return pickle.loads(data)
+
+    def put(self, path, data, signature):
+        """Cache the parsed data of a file with the (mtime, size, digest) signature of its parsed content"""
+        self.load().entries[path] = (
+            *signature, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        self.changed = True
+
+
+def file_digest(path):
+    """Hash of the content of a file"""
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+
 class ProcessLoader:
 
-    def __init__(self):
+    def __init__(self, cache=None):
         self.processes = list()
+        self.cache = cache  # Optional ManifestCache of the parsed files.
 
     def load(self, input_path):
         """Load processes from yaml files in a directory"""
         mlog.log.debug(f'Discovering processes in {input_path}...')
-        for yaml_file_name in [file_name for file_name
-                               in os.listdir(input_path)
-                               if file_name.lower().endswith(('.yaml', '.yml'))]:
+        # Processes run in file name order
+        yaml_file_names = sorted(file_name for file_name
+                                 in os.listdir(input_path)
+                                 if file_name.lower().endswith(('.yaml', '.yml')))
+        for yaml_file_name, (process, error) in zip(yaml_file_names, parse_manifests(
+                [os.path.join(input_path, file_name) for file_name in yaml_file_names],
+                cache=self.cache)):
             mlog.log.debug(f'Reading process {yaml_file_name}')
-            with open(os.path.join(input_path, yaml_file_name), 'r') as file:
-                process = None
-                try:
-                    process = yaml.load(file.read(),
-                                        Loader=yaml.SafeLoader)
-                except parser.ParserError as err:
-                    print(yaml_file_name, ':', err)
-                if process:
-                    self.processes.append(process)
+            if error:
+                print(yaml_file_name, ':', error)
+            if process:
+                self.processes.append(process)
 
 
 class NodeLoader:
     """Load yaml from a given path"""
 
-    def __init__(self):
+    def __init__(self, cache=None):
         """Initialize."""
         self.nodes = dict()  # key:Node's name.
         self.inspect_nodes = defaultdict(list)
         self.virtualize_missing_dependencies = False
+        self.cache = cache  # Optional ManifestCache of the parsed files.
 
     @staticmethod
     def get_base_inspect_nodes():
@@ -311,12 +439,12 @@ class NodeLoader:
         return conflict_status
 
     def get_subdir_list(self, input_path):
-        """Get subdir list"""
+        """Get subdir list, sorted so nodes are always added in the same order"""
         r_list = list()
         for dir_path, dir_names, file_names in os.walk(input_path):
             for file_name in file_names:
                 r_list.append(os.path.join(dir_path, file_name))
-        return r_list
+        return sorted(r_list)
 
     def get_wellknown_environments(self, input_path):
         """Get environments included in 'environments' folder"""
@@ -351,37 +479,35 @@ class NodeLoader:
         node["environments"] = {}
         return node
 
-    def load(self, input_path, inspect=False):
-        """Load nodes from input_path"""
+    def load(self, input_path, inspect=False, workers=None):
+        """Load nodes from input_path, parsing the files across worker processes"""
         mlog.log.debug(f"Loading nodes from: {input_path}...")
-        for yaml_file_name in [file_name for file_name
-                               in self.get_subdir_list(input_path)
-                               if file_name.lower().endswith(('.yaml', '.yml'))]:
-            with open(yaml_file_name, 'r') as file:
-                node = None
-                try:
-                    node = yaml.load(file.read(),
-                                     Loader=yaml.SafeLoader)
-                except parser.ParserError as err:
-                    mlog.log.error(yaml_file_name, ':', err)
-                if node:
-                    # Add file name to node
-                    node['file_name'] = yaml_file_name
-                    # Add node
-                    node = self.set_diff_env(node)
-                    self.add_node(node, inspect)
-                    # Attempt to add output nodes
-                    if 'produces' in node:
-                        output_nodes = node['produces']
-                        if isinstance(output_nodes, (str, dict)):
-                            output_nodes = [output_nodes]
-                        for output_node in output_nodes:
-                            if isinstance(output_node, str):
-                                output_node = dict(name=output_node,
-                                                   environments=node['environments'])
-                            self.add_virtual_node(output_node['name'],
-                                                  output_node['environments'],
-                                                  node['file_name'], inspect)
+        yaml_file_names = [file_name for file_name
+                           in self.get_subdir_list(input_path)
+                           if file_name.lower().endswith(('.yaml', '.yml'))]
+        # Nodes are added in file order, whichever worker parsed them
+        for yaml_file_name, (node, error) in zip(
+                yaml_file_names, parse_manifests(yaml_file_names, workers, self.cache)):
+            if error:
+                mlog.log.error(f'{yaml_file_name}: {error}')
+            if node:
+                # Add file name to node
+                node['file_name'] = yaml_file_name
+                # Add node
+                node = self.set_diff_env(node)
+                self.add_node(node, inspect)
+                # Attempt to add output nodes
+                if 'produces' in node:
+                    output_nodes = node['produces']
+                    if isinstance(output_nodes, (str, dict)):
+                        output_nodes = [output_nodes]
+                    for output_node in output_nodes:
+                        if isinstance(output_node, str):
+                            output_node = dict(name=output_node,
+                                               environments=node['environments'])
+                        self.add_virtual_node(output_node['name'],
+                                              output_node['environments'],
+                                              node['file_name'], inspect)
 
     def find_parents(self, environment):
         """Find parents in selected environment"""
@@ -532,7 +658,8 @@ class NodeLoader:
                     file_name=node.file_name,
                     actions=node.actions,
                     produces=node.produces,
-                    environments=node.environments)
+                    environments=node.environments,
+                    labels=node.labels)
 
     def validate_cyclic_dependencies(self, graph, environment, inspect=False):
         """Validate cyclic dependencies in the graph"""
@@ -109,6 +109,10 @@ def start_thread_logging(current_phase, thread_name, thread_log_path, loglevel):
 
 
 def stop_thread_logging(log_handler):
+    # Forget the handler, workers are reused by the next nodes
+    for key, handler in list(HANDLERS.items()):
+        if handler is log_handler:
+            del HANDLERS[key]
     # Remove thread log handler from root logger
     logging.getLogger().removeHandler(log_handler)
     # Close the thread log handler so that the lock on log file can be released
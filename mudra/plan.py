@@ -0,0 +1,66 @@
+"""Compiled execution plans.
+
+A plan holds the validated graph of an environment with the actions of
+every node and the waves of every phase, so a run can start without loading the manifests
+again. Plans are zlib compressed JSON behind a versioned header, and
+keep a fingerprint of the data files they were compiled from: a plan is
+rejected once a manifest or environment file changed."""
+
+import hashlib
+import json
+import os
+import zlib
+
+import click
+
+import mudra.mlog as mlog
+
+
+PLAN_HEADER = b'MUDRA-PLAN 2\n'
+# Data files directories the graph is compiled from
+FINGERPRINT_DIRECTORIES = ('nodes', 'environments')
+
+
+def fingerprint(data_files_directory):
+    """Hash of the paths, sizes and modification times of the data files"""
+    digest = hashlib.sha256()
+    for directory in FINGERPRINT_DIRECTORIES:
+        for root, dirs, files in os.walk(
+                os.path.join(data_files_directory, directory)):
+            dirs.sort()
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                stat = os.stat(path)
+                digest.update(
+                    f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+
+def write_plan(path, plan):
+    """Write a plan file"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    data = zlib.compress(json.dumps(plan, separators=(',', ':')).encode(), 9)
+    with open(path, 'wb') as plan_file:
+        plan_file.write(PLAN_HEADER + data)
+    mlog.log.info(f'Plan written to {path} ({len(data)} bytes)')
+
+
+def read_plan(path):
+    """Read a plan file, reject it if its data files changed"""
+    try:
+        with open(path, 'rb') as plan_file:
+            data = plan_file.read()
+    except OSError as error:
+        raise click.ClickException(f'Cannot read plan {path}: {error}')
+    if not data.startswith(PLAN_HEADER):
+        raise click.ClickException(
+            f'{path} is not a plan of this mudra version')
+    try:
+        plan = json.loads(zlib.decompress(data[len(PLAN_HEADER):]))
+    except (zlib.error, ValueError) as error:
+        raise click.ClickException(f'Invalid plan {path}: {error}')
+    if fingerprint(plan['data_files_directory']) != plan['fingerprint']:
+        raise click.ClickException(
+            f'Plan {path} is stale, data files in {plan["data_files_directory"]} '
+            'changed since it was compiled')
+    return plan
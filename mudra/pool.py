@@ -0,0 +1,91 @@
+"""Worker pool kept alive for a whole orchestration run.
+
+Creating a process pool per wave forks the workers again for every wave of
+every phase, the same pool is reused instead."""
+
+import concurrent.futures
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import mudra.mlog as mlog
+from mudra.executors import create_executor
+
+
+HEALTH_CHECK_TIMEOUT = 30
+
+
+class WorkerPool:
+    """Long-lived worker pool with an explicit lifecycle."""
+
+    def __init__(self, maxworkers, initializer=None, initargs=(),
+                 backend='process'):
+        """Initialize.
+
+        maxworkers: int, number of workers.
+        initializer: optional callable run once by every worker.
+        initargs: tuple of arguments for the initializer.
+        backend: str, one of mudra.executors.EXECUTORS.
+        """
+        self.maxworkers = maxworkers
+        self.backend = backend
+        self.initializer = initializer
+        self.initargs = initargs
+        self.executor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def __getstate__(self):
+        """Executors can't be pickled, workers get an empty pool"""
+        return dict(maxworkers=self.maxworkers, initializer=None,
+                    initargs=(), backend=self.backend, executor=None)
+
+    @property
+    def running(self):
+        return self.executor is not None
+
+    def start(self):
+        """Start the workers if not running"""
+        if not self.running:
+            mlog.log.info(f'Starting worker pool: {self.maxworkers} '
+                          f'{self.backend} workers')
+            self.executor = create_executor(
+                self.backend, self.maxworkers,
+                initializer=self.initializer,
+                initargs=self.initargs)
+        return self
+
+    def shutdown(self, wait=True):
+        """Stop the workers"""
+        if self.running:
+            mlog.log.info('Stopping worker pool')
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+
+    def restart(self):
+        """Replace the workers with a new pool"""
+        self.shutdown(wait=False)
+        self.start()
+
+    def check(self):
+        """Check that the workers answer, restart the pool otherwise"""
+        if not self.running:
+            self.start()
+        try:
+            pid = self.executor.submit(os.getpid).result(
+                timeout=HEALTH_CHECK_TIMEOUT)
+            mlog.log.debug(f'Worker pool healthy, worker pid: {pid}')
+        except (BrokenProcessPool, concurrent.futures.TimeoutError) as error:
+            mlog.log.error(f'Worker pool not healthy, restarting: {error!r}')
+            self.restart()
+
+    def submit(self, fn, *args):
+        """Schedule fn(*args) on a worker"""
+        return self.executor.submit(fn, *args)
+
+    def map(self, fn, *iterables):
+        """Run fn over the iterables on the workers"""
+        return self.executor.map(fn, *iterables)
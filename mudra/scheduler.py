@@ -0,0 +1,180 @@
+"""Dependency-driven node scheduling.
+
+Dispatch graph nodes as soon as their own dependencies complete, instead
+of waiting for a whole wave of nodes to finish."""
+
+import concurrent.futures
+import heapq
+import itertools
+
+import networkx as nx
+
+import mudra.mlog as mlog
+
+
+def critical_path_priorities(graph, durations):
+    """Get the longest remaining path of every node.
+
+    graph: networkx DiGraph, edges from node to dependency.
+    durations: dict, key:node name, value:expected duration.
+    Parents run after their children, so the remaining path of a node
+    goes through its parents up to the nodes without parents.
+    """
+    priorities = dict()
+    # Parents are sorted before their children
+    for node in nx.topological_sort(graph):
+        priorities[node] = durations.get(node, 0) + max(
+            (priorities[parent] for parent in graph.predecessors(node)),
+            default=0)
+    return priorities
+
+
+def pipeline_graph(graph, phases):
+    """Expand a dependency graph over consecutive phases.
+
+    graph: networkx DiGraph, edges from node to dependency.
+    phases: iterable of int, in execution order.
+    Nodes of the expanded graph are (node, phase) tuples, each depending on
+    its dependencies in the same phase and on itself in the previous phase.
+    """
+    pipeline = nx.DiGraph()
+    previous_phase = None
+    for phase in phases:
+        pipeline.add_nodes_from((node, phase) for node in graph)
+        pipeline.add_edges_from(((node, phase), (dependency, phase))
+                                for node, dependency in graph.edges)
+        if previous_phase is not None:
+            pipeline.add_edges_from(((node, phase), (node, previous_phase))
+                                    for node in graph)
+        previous_phase = phase
+    return pipeline
+
+
+class ReadyQueue:
+    """Track the pending dependencies of every node in a graph.
+
+    Edges point from a node to its dependencies (children), so a node is
+    ready once all of its children have completed. Ready nodes are popped
+    by highest priority first."""
+
+    def __init__(self, graph, priority=None):
+        """Initialize."""
+        self.graph = graph
+        self.priority = priority or {}
+        self.counter = itertools.count()  # Keep insertion order on ties
+        # Number of children not completed yet, per node
+        self.pending = {node: graph.out_degree(node) for node in graph}
+        self.ready = []
+        for node, count in self.pending.items():
+            if count == 0:
+                self.push(node)
+        self.remaining = len(self.pending)
+
+    def __bool__(self):
+        return bool(self.ready)
+
+    def push(self, node):
+        """Add a ready node"""
+        heapq.heappush(self.ready, (-self.priority.get(node, 0),
+                                    next(self.counter), node))
+
+    def pop(self):
+        """Get the next ready node"""
+        return heapq.heappop(self.ready)[-1]
+
+    def take(self, match, count):
+        """Remove and get up to count ready nodes matching, highest priority first"""
+        taken = [entry for entry in sorted(self.ready) if match(entry[-1])][:count]
+        if taken:
+            taken_ids = set(entry[1] for entry in taken)
+            self.ready = [entry for entry in self.ready
+                          if entry[1] not in taken_ids]
+            heapq.heapify(self.ready)
+        return [entry[-1] for entry in taken]
+
+    def complete(self, node):
+        """Mark node as completed and release its parents"""
+        self.remaining -= 1
+        for parent in self.graph.predecessors(node):
+            self.pending[parent] -= 1
+            if not self.pending[parent]:
+                self.push(parent)
+
+
+class Scheduler:
+    """Run graph nodes through an executor following the dependencies."""
+
+    def __init__(self, graph, maxworkers, priority=None, limits=None,
+                 batch_key=None, batch_size=1):
+        """Initialize.
+
+        graph: networkx DiGraph, edges from node to dependency.
+        maxworkers: int, maximum number of nodes running at once.
+        priority: optional dict, key:node name, value:rank, the ready
+        nodes with the highest rank are dispatched first.
+        limits: optional mudra.limits.ConcurrencyLimits, ready nodes wait
+        while one of their pools is full.
+        batch_key: optional callable receiving a node name, ready nodes
+        with the same key are dispatched together to a worker.
+        batch_size: int, maximum number of nodes dispatched together.
+        """
+        self.graph = graph
+        self.maxworkers = maxworkers
+        self.priority = priority
+        self.limits = limits
+        self.batch_key = batch_key
+        self.batch_size = batch_size
+
+    def run(self, submit, on_complete=None):
+        """Dispatch every node of the graph.
+
+        submit: callable receiving a node name and returning a future, with
+        batch_key it receives a list of node names and the future returns
+        the list of their results.
+        on_complete: optional callable receiving a node name and its result.
+        """
+        queue = ReadyQueue(self.graph, self.priority)
+        running = dict()  # key:future, value:list of node names.
+        while queue or running:
+            # Fill the free workers with ready nodes
+            waiting = []  # Ready nodes with a full pool
+            while queue and len(running) < self.maxworkers:
+                node = queue.pop()
+                if self.limits and not self.limits.acquire(node):
+                    waiting.append(node)
+                    continue
+                if self.batch_key is None:
+                    mlog.log.debug(f"Dispatching node: {node}")
+                    running[submit(node)] = [node]
+                    continue
+                batch = [node]
+                key = self.batch_key(node)
+                for other in queue.take(lambda other: self.batch_key(other) == key,
+                                        self.batch_size - 1):
+                    if self.limits and not self.limits.acquire(other):
+                        waiting.append(other)
+                    else:
+                        batch.append(other)
+                mlog.log.debug(f"Dispatching nodes: {batch}")
+                running[submit(batch)] = batch
+            for node in waiting:
+                mlog.log.debug(f"Node waiting for a pool: {node}")
+                queue.push(node)
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                nodes = running.pop(future)
+                if self.limits:
+                    for node in nodes:
+                        self.limits.release(node)
+                # Raise errors from the worker
+                results = future.result()
+                if self.batch_key is None:
+                    results = [results]
+                for node, result in zip(nodes, results):
+                    if on_complete:
+                        on_complete(node, result)
+                    queue.complete(node)
+        if queue.remaining:
+            mlog.log.error(
+                f"Nodes not dispatched, dependencies never completed: {queue.remaining}")
@@ -0,0 +1,155 @@
+"""Selection of the nodes to run, before scheduling.
+
+--node, --nodes, --nodetype and --nodefilter select nodes of the graph,
+optionally with the nodes depending on them (ancestors) or the nodes they
+depend on (descendants). The selected nodes are kept as a graph of their
+own, so nothing is dispatched for the other nodes.
+
+A filter is a comma-separated list of terms, all of them must match:
+
+    type=App,meta.K8S_TARGET_NAMESPACE=payments
+    team=checkout|payments,label!=legacy
+    edge-*
+
+Terms compare a field (name, type, label, team, or meta.<KEY>) with
+shell-style patterns separated by `|`, `!=` negates the term and a bare
+pattern matches the node name. team is the directory of the node manifest,
+as for the teams of the node interfaces."""
+
+import fnmatch
+import os
+from collections import defaultdict
+
+import click
+import networkx as nx
+
+
+FILTER_FIELDS = ('name', 'type', 'label', 'team', 'meta.<KEY>')
+# Characters making a pattern a glob rather than a value
+GLOB_CHARACTERS = set('*?[')
+
+
+class NodeIndex:
+    """Node names by value of every filtered field, built on first use."""
+
+    def __init__(self, nodes):
+        """Initialize.
+
+        nodes: dict, key:node name, value:Node.
+        """
+        self.nodes = nodes
+        self.indexes = dict()  # key:field, value:dict value:set of node names.
+
+    def field_values(self, node, field):
+        """Get the values of a field of a node"""
+        if field == 'name':
+            return [node.name]
+        if field == 'type':
+            return [node.type]
+        if field == 'label':
+            return node.labels
+        if field == 'team':
+            return [os.path.basename(os.path.dirname(node.file_name))]
+        if field.startswith('meta.'):
+            key = field[len('meta.'):]
+            return [str(node.meta[key])] if key in node.meta else []
+        raise click.ClickException(
+            f'Invalid filter field `{field}`, use one of: {", ".join(FILTER_FIELDS)}')
+
+    def index(self, field):
+        """Get the node names by value of a field"""
+        if field not in self.indexes:
+            index = defaultdict(set)
+            for node_name, node in self.nodes.items():
+                for value in self.field_values(node, field):
+                    index[value].add(node_name)
+            self.indexes[field] = index
+        return self.indexes[field]
+
+    def match(self, field, patterns):
+        """Get the names of the nodes with a field value matching one of the patterns"""
+        index = self.index(field)
+        names = set()
+        for pattern in patterns:
+            if GLOB_CHARACTERS.isdisjoint(pattern):
+                names |= index.get(pattern, set())
+                continue
+            for value, value_names in index.items():
+                if fnmatch.fnmatchcase(value, pattern):
+                    names |= value_names
+        return names
+
+
+def parse_filter(text):
+    """Get the (field, negated, patterns) terms of a filter expression"""
+    terms = []
+    for term in text.split(','):
+        term = term.strip()
+        if not term:
+            continue
+        field, separator, patterns = term.partition('=')
+        if not separator:
+            field, patterns = 'name', term
+        negated = field.endswith('!')
+        field = field.rstrip('!').strip()
+        terms.append((field, negated, patterns.split('|')))
+    if not terms:
+        raise click.ClickException(f'Empty node filter `{text}`')
+    return terms
+
+
+def select_nodes(graph, nodes, names=None, node_type=None, node_filter=None,
+                 ancestors=False, descendants=False):
+    """Get the names of the selected nodes of a graph.
+
+    graph: networkx DiGraph, edges from node to dependency.
+    nodes: dict, key:node name, value:Node.
+    names: optional list of node names.
+    node_type: optional str, type of the selected nodes.
+    node_filter: optional str, filter expression.
+    ancestors: bool, add the nodes depending on the selected nodes.
+    descendants: bool, add the nodes the selected nodes depend on.
+    """
+    index = NodeIndex({node_name: nodes[node_name] for node_name in graph})
+    selected = set(graph)
+    if names:
+        missing = set(names) - selected
+        if missing:
+            raise click.ClickException(
+                f'Nodes not in the graph of the environment: {", ".join(sorted(missing))}')
+        selected &= set(names)
+    if node_type:
+        selected &= index.match('type', [node_type])
+    if node_filter:
+        for field, negated, patterns in parse_filter(node_filter):
+            matched = index.match(field, patterns)
+            selected = selected - matched if negated else selected & matched
+    closure = set()
+    for node_name in selected:
+        if ancestors:
+            closure |= nx.ancestors(graph, node_name)
+        if descendants:
+            closure |= nx.descendants(graph, node_name)
+    return selected | closure
+
+
+def selected_graph(graph, selected):
+    """Get the graph of the selected nodes.
+
+    Selected nodes keep their order through the nodes left out: a node
+    depends on the selected nodes reached through unselected dependencies.
+    """
+    subgraph = nx.DiGraph(graph.subgraph(selected))
+    for node_name in selected:
+        # Walk the unselected dependencies up to the next selected nodes
+        pending = [dependency for dependency in graph.successors(node_name)
+                   if dependency not in selected]
+        visited = set(pending)
+        while pending:
+            for dependency in graph.successors(pending.pop()):
+                if dependency in selected:
+                    subgraph.add_edge(node_name, dependency)
+                elif dependency not in visited:
+                    visited.add(dependency)
+                    pending.append(dependency)
+    return subgraph
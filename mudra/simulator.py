@@ -0,0 +1,96 @@
+"""Discrete-event simulation of the node scheduler.
+
+Replays the dispatching of Scheduler.run with the expected duration of
+every node instead of running its actions, to predict the run time of a
+graph for a number of workers."""
+
+import heapq
+import itertools
+from typing import NamedTuple
+
+import click
+
+from mudra.scheduler import ReadyQueue, critical_path_priorities
+
+
+class Simulation(NamedTuple):
+    """Predicted run of a graph."""
+    makespan: float
+    busy: float  # Sum of the worker time spent running nodes.
+
+    def __add__(self, other):
+        return Simulation(self.makespan + other.makespan,
+                          self.busy + other.busy)
+
+
+def simulate(graph, durations, maxworkers, priority=None, limits=None):
+    """Simulate the dispatching of a graph by the scheduler.
+
+    graph: networkx DiGraph, edges from node to dependency.
+    durations: dict, key:node name, value:expected duration.
+    maxworkers: int, number of workers.
+    priority: optional dict, key:node name, value:priority.
+    limits: optional ConcurrencyLimits of the nodes.
+    """
+    queue = ReadyQueue(graph, priority)
+    counter = itertools.count()  # Keep dispatch order on ties
+    running = []  # Heap of (finish time, dispatch order, node).
+    now = 0
+    busy = 0
+    while queue or running:
+        # Fill the free workers with ready nodes
+        waiting = []  # Ready nodes with a full pool
+        while queue and len(running) < maxworkers:
+            node = queue.pop()
+            if limits and not limits.acquire(node):
+                waiting.append(node)
+                continue
+            duration = durations.get(node, 0)
+            busy += duration
+            heapq.heappush(running, (now + duration, next(counter), node))
+        for node in waiting:
+            queue.push(node)
+        if not running:
+            # Dependencies never completed
+            break
+        # Complete every node finishing at the next event time
+        now = running[0][0]
+        while running and running[0][0] == now:
+            _, _, node = heapq.heappop(running)
+            if limits:
+                limits.release(node)
+            queue.complete(node)
+    return Simulation(now, busy)
+
+
+def critical_path(graph, durations):
+    """Get the longest chain of nodes in execution order and its duration"""
+    priorities = critical_path_priorities(graph, durations)
+    if not priorities:
+        return [], 0
+    # Start from the first node of the longest chain, a leaf of the graph
+    node = max((node for node in graph if graph.out_degree(node) == 0),
+               key=lambda node: priorities[node])
+    path = [node]
+    while True:
+        parents = list(graph.predecessors(node))
+        if not parents:
+            break
+        node = max(parents, key=lambda parent: priorities[parent])
+        path.append(node)
+    return path, priorities[path[0]]
+
+
+def parse_worker_counts(text):
+    """Get the worker counts of a comma-separated list of counts and ranges, e.g. 1-8,16,32"""
+    counts = set()
+    try:
+        for part in text.split(','):
+            first, _, last = part.partition('-')
+            counts.update(range(int(first), int(last or first) + 1))
+    except ValueError:
+        counts = set()
+    if not counts or min(counts) < 1:
+        raise click.ClickException(
+            f'Invalid worker counts `{text}`, expected counts and ranges such as 1-8,16,32')
+    return sorted(counts)
@@ -0,0 +1,31 @@
+"""Tasks sent to the workers.
+
+A task only carries the data of its own node, the settings shared by every
+node are loaded once per worker."""
+
+from typing import Dict, List, NamedTuple
+
+from mudra.components import Node
+from mudra.manifest import NodeLoader
+
+
+class NodeTask(NamedTuple):
+    """Orchestration of a single node in a phase."""
+    name: str
+    type: str
+    phase: int
+    actions: List[str]
+    node: Dict
+
+    @classmethod
+    def from_node(cls, node, phase, actions):
+        """Build the task of a loaded node"""
+        return cls(name=node.name,
+                   type=node.type,
+                   phase=phase,
+                   actions=actions,
+                   node=NodeLoader.json_serial(node))
+
+    def get_node(self):
+        """Rebuild the node on the worker side"""
+        return Node(**self.node)
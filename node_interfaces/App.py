@@ -31,19 +31,17 @@ dryrun = False
 def __configure_dryrun(nodejson):
     global dryrun
     dryrun = True
-    # Load node
-    node = json.loads(nodejson)
-    name = node['name']
-    thread_id = node['thread_id']
-    # Write DRYRUN to metadata
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('DRYRUN=True\n')
+    # Add DRYRUN to the node environment
+    set_vars(dict(DRYRUN='True'))
+
+
+def set_vars(variables):
+    os.environ.update(variables)
 
 
-def unset_vars(file_name, var_names):
-    with open(file_name, 'a') as node_env:
-        for var_name in var_names:
-            node_env.write(f'unset {var_name}\n')
+def unset_vars(var_names):
+    for var_name in var_names:
+        os.environ.pop(var_name, None)
 
 
 @click.group()
@@ -82,14 +80,11 @@ def startdryrun(ctx, json_string):
 @click.pass_context
 def waitforapp(ctx, json_string):
     node = json.loads(json_string)
-    thread_id = node['thread_id']
     name = node['name']
-    node_env_file = f'{name}-thread{thread_id}'
     if_utils.execute_bash(
         f'{SCRIPTS_DIRECTORY}/waitforapp.sh',
         name,
         SIM_SECONDS,
-        node_env_file,
         node_type='App',
         service_name=name
     )
@@ -166,14 +161,11 @@ def helloworlddryrun(ctx, json_string):
 @click.pass_context
 def cutover_k8s(ctx, json_string):
     node = json.loads(json_string)
-    thread_id = node['thread_id']
     name = node['name']
-    node_env_file = f'{name}-thread{thread_id}'
     if_utils.execute_bash(
         f'{SCRIPTS_DIRECTORY}/../Cutover/k8s.sh',
         name,
         SIM_SECONDS,
-        node_env_file,
         node_type='App',
         service_name=name,
     )
@@ -194,23 +186,18 @@ def cutover_k8sdryrun(ctx, json_string):
 @click.pass_context
 def deletesourcepvcs(ctx, json_string):
     node = json.loads(json_string)
-    thread_id = node['thread_id']
     name = node['name']
-    node_env_file = f'{name}-thread{thread_id}'
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('DELETE_SOURCE_PVCS=True\n')
+    set_vars(dict(DELETE_SOURCE_PVCS='True'))
     if_utils.execute_bash(
         f'{SCRIPTS_DIRECTORY}/deletepvcs.sh',
         name,
         SIM_SECONDS,
-        node_env_file,
         node_type='App',
         service_name=name,
         timeout=60,
         delayoutput=True
     )
-    unset_vars(f'.meta/{name}-thread{thread_id}.env',
-               ['DELETE_SOURCE_PVCS'])
+    unset_vars(['DELETE_SOURCE_PVCS'])
 
 
 @cli.command()
@@ -228,21 +215,16 @@ def deletesourcepvcsdryrun(ctx, json_string):
 @click.pass_context
 def deletetargetpvcs(ctx, json_string):
     node = json.loads(json_string)
-    thread_id = node['thread_id']
     name = node['name']
-    node_env_file = f'{name}-thread{thread_id}'
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('DELETE_TARGET_PVCS=True\n')
+    set_vars(dict(DELETE_TARGET_PVCS='True'))
     if_utils.execute_bash(
         f'{SCRIPTS_DIRECTORY}/deletepvcs.sh',
         name,
         SIM_SECONDS,
-        node_env_file,
         node_type='App',
         service_name=name
     )
-    unset_vars(f'.meta/{name}-thread{thread_id}.env',
-               ['DELETE_TARGET_PVCS'])
+    unset_vars(['DELETE_TARGET_PVCS'])
 
 
 @cli.command()
@@ -261,11 +243,9 @@ def deletetargetpvcsdryrun(ctx, json_string):
 def preflight(ctx, json_string):
     node = json.loads(json_string)
     name = node['name']
-    thread_id = node['thread_id']
     log = if_utils.get_logger(name, node_type='App', node_action='preflight')
     log.info("preflight")
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('PREFLIGHT=True\n')
+    set_vars(dict(PREFLIGHT='True'))
     ctx.forward(cutover_k8s)
 
 
@@ -285,14 +265,11 @@ def preflightdryrun(ctx, json_string):
 def scaletarget(ctx, json_string):
     node = json.loads(json_string)
     name = node['name']
-    thread_id = node['thread_id']
     log = if_utils.get_logger(name, node_type='App', node_action='scaletarget')
     log.info("scaletarget")
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('K8S_TARGET_ONLY=True\n')
+    set_vars(dict(K8S_TARGET_ONLY='True'))
     ctx.forward(cutover_k8s)
-    unset_vars(f'.meta/{name}-thread{thread_id}.env',
-               ['K8S_TARGET_ONLY'])
+    unset_vars(['K8S_TARGET_ONLY'])
 
 
 @cli.command()
@@ -311,15 +288,12 @@ def scaletargetdryrun(ctx, json_string):
 def scaletargetdown(ctx, json_string):
     node = json.loads(json_string)
     name = node['name']
-    thread_id = node['thread_id']
     log = if_utils.get_logger(name, node_type='App',
                               node_action='scaletargetdown')
     log.info("scaletargetdown")
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('K8S_TARGET_ONLY=True\nK8S_MAX_INSTANCES=0\n')
+    set_vars(dict(K8S_TARGET_ONLY='True', K8S_MAX_INSTANCES='0'))
     ctx.forward(cutover_k8s)
-    unset_vars(f'.meta/{name}-thread{thread_id}.env',
-               ['K8S_TARGET_ONLY', 'K8S_MAX_INSTANCES'])
+    unset_vars(['K8S_TARGET_ONLY', 'K8S_MAX_INSTANCES'])
 
 
 @cli.command()
@@ -338,14 +312,11 @@ def scaletargetdowndryrun(ctx, json_string):
 def scalesource(ctx, json_string):
     node = json.loads(json_string)
     name = node['name']
-    thread_id = node['thread_id']
     log = if_utils.get_logger(name, node_type='App', node_action='scalesource')
     log.info("scalesource")
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('K8S_SOURCE_ONLY=True\n')
+    set_vars(dict(K8S_SOURCE_ONLY='True'))
     ctx.forward(cutover_k8s)
-    unset_vars(f'.meta/{name}-thread{thread_id}.env',
-               ['K8S_SOURCE_ONLY'])
+    unset_vars(['K8S_SOURCE_ONLY'])
 
 
 @cli.command()
@@ -364,15 +335,12 @@ def scalesourcedryrun(ctx, json_string):
 def scalesourcedown(ctx, json_string):
     node = json.loads(json_string)
     name = node['name']
-    thread_id = node['thread_id']
     log = if_utils.get_logger(name, node_type='App',
                               node_action='scalesourcedown')
     log.info("scalesourcedown")
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('K8S_SOURCE_ONLY=True\nK8S_MAX_INSTANCES=0\n')
+    set_vars(dict(K8S_SOURCE_ONLY='True', K8S_MAX_INSTANCES='0'))
     ctx.forward(cutover_k8s)
-    unset_vars(f'.meta/{name}-thread{thread_id}.env',
-               ['K8S_SOURCE_ONLY', 'K8S_MAX_INSTANCES'])
+    unset_vars(['K8S_SOURCE_ONLY', 'K8S_MAX_INSTANCES'])
 
 
 @cli.command()
@@ -391,15 +359,12 @@ def scalesourcedowndryrun(ctx, json_string):
 def rollbacksource(ctx, json_string):
     node = json.loads(json_string)
     name = node['name']
-    thread_id = node['thread_id']
     log = if_utils.get_logger(name, node_type='App',
                               node_action='rollbacksource')
     log.info("rollbacksource")
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('K8S_SOURCE_ONLY=True\nROLLBACK_K8S=True\n')
+    set_vars(dict(K8S_SOURCE_ONLY='True', ROLLBACK_K8S='True'))
     ctx.forward(cutover_k8s)
-    unset_vars(f'.meta/{name}-thread{thread_id}.env',
-               ['K8S_SOURCE_ONLY', 'ROLLBACK_K8S'])
+    unset_vars(['K8S_SOURCE_ONLY', 'ROLLBACK_K8S'])
 
 
 @cli.command()
@@ -418,15 +383,12 @@ def rollbacksourcedryrun(ctx, json_string):
 def rollbacktarget(ctx, json_string):
     node = json.loads(json_string)
     name = node['name']
-    thread_id = node['thread_id']
     log = if_utils.get_logger(name, node_type='App',
                               node_action='rollbacktarget')
     log.info("rollbacktarget")
-    with open(f'.meta/{name}-thread{thread_id}.env', 'a') as node_env:
-        node_env.write('K8S_TARGET_ONLY=True\nROLLBACK_K8S=True\n')
+    set_vars(dict(K8S_TARGET_ONLY='True', ROLLBACK_K8S='True'))
     ctx.forward(cutover_k8s)
-    unset_vars(f'.meta/{name}-thread{thread_id}.env',
-               ['K8S_TARGET_ONLY', 'ROLLBACK_K8S'])
+    unset_vars(['K8S_TARGET_ONLY', 'ROLLBACK_K8S'])
 
 
 @cli.command()
@@ -469,5 +431,9 @@ def donothing(ctx, json_string):
     pass
 
 
+if_utils.add_batch_command(cli)
+if_utils.add_daemon_command(cli)
+
+
 if __name__ == '__main__':
     cli()
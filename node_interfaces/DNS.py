@@ -90,5 +90,9 @@ def fail(ctx, json_string):
     click.exit(1)
 
 
+if_utils.add_batch_command(cli)
+if_utils.add_daemon_command(cli)
+
+
 if __name__ == '__main__':
     cli()
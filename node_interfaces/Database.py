@@ -22,7 +22,6 @@ import time
 import threading
 import yaml
 from collections import defaultdict
-from dotenv import load_dotenv
 from dotenv import dotenv_values
 from if_utils import check_name
 from jmespath import search as jp
@@ -78,9 +77,7 @@ def save_task_result(name, action, value):
 def go_for_it(ctx, json_string, action, prev_action=''):
     node_data = json.loads(json_string)
     node_name = node_data['name']
-    thread_id = node_data['thread_id']
     log = if_utils.get_logger(node_name, 'Database', node_action=action)
-    load_dotenv(f'.meta/{node_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if prev_action and (result := get_task_result(node_name, prev_action)) != 'OK':
         log.error(f'Previous action {prev_action} not ok ({result=})')
@@ -197,9 +194,7 @@ def cleanup(ctx, json_string):
 @click.argument('json_string', callback=check_name)
 def get_cleanup(json_string):
     node_name = json.loads(json_string)['name']
-    thread_id = json.loads(json_string)['thread_id']
     log = if_utils.get_logger(node_name, 'Database', node_action='get_cleanup')
-    load_dotenv(f'.meta/{node_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if environment == 'local':
         return
@@ -236,9 +231,7 @@ def swap(ctx, json_string):
 @click.pass_context
 def check_sync(ctx, json_string):
     node_name = json.loads(json_string)['name']
-    thread_id = json.loads(json_string)['thread_id']
     log = if_utils.get_logger(node_name, 'Database', node_action='check_sync')
-    load_dotenv(f'.meta/{node_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if environment == 'local':
         return
@@ -278,10 +271,8 @@ def cutover(ctx, json_string):
 @click.pass_context
 def check_cutover(ctx, json_string):
     node_name = json.loads(json_string)['name']
-    thread_id = json.loads(json_string)['thread_id']
     log = if_utils.get_logger(node_name, 'Database',
                               node_action='check_cutover')
-    load_dotenv(f'.meta/{node_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if environment == 'local':
         return
@@ -302,10 +293,8 @@ def check_cutover(ctx, json_string):
 @click.pass_context
 def get_status(ctx, json_string):
     service_name = json.loads(json_string)['name']
-    thread_id = json.loads(json_string)['thread_id']
     log = if_utils.get_logger(service_name, 'Database',
                               node_action='get_status')
-    load_dotenv(f'.meta/{service_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if environment == 'local':
         return
@@ -385,8 +374,6 @@ def precutoverdryrun(ctx, json_string):
 @click.pass_context
 def precutover(ctx, json_string):
     service_name = json.loads(json_string)['name']
-    thread_id = json.loads(json_string)['thread_id']
-    load_dotenv(f'.meta/{service_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if environment == 'local':
         return
@@ -409,14 +396,12 @@ def preswapdryrun(ctx, json_string):
 @click.pass_context
 def preswap(ctx, json_string):
     service_name = json.loads(json_string)['name']
-    thread_id = json.loads(json_string)['thread_id']
     prev_action = 'preflight'
     if get_task_result(service_name, prev_action) != 'OK':
         log = if_utils.get_logger(service_name, 'Database',
                                   node_action='preswap')
         log.error(f'Previous action {prev_action} not ok.')
         ctx.exit(1)
-    load_dotenv(f'.meta/{service_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if environment == 'local':
         ctx.forward(pretest)
@@ -448,9 +433,7 @@ def pretest(json_string):
 def test(json_string):
     node_data = json.loads(json_string)
     node_name = node_data['name']
-    thread_id = node_data['thread_id']
     log = if_utils.get_logger(node_name, 'Database', node_action='test')
-    load_dotenv(f'.meta/{node_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     host_ip = os.getenv('CLOUDSQL_MIGRATION_IP')
     out_dir = os.getenv('CLOUDSQL_OUTPUT_DIR', '/tmp')
@@ -466,14 +449,11 @@ def test(json_string):
 @click.pass_context
 def cutover_dksdryrun(ctx, json_string):
     node = json.loads(json_string)
-    thread_id = node['thread_id']
     name = node['name']
-    node_env_file = f'{name}-thread{thread_id}'
     bash = (
         f'{SCRIPTS_DIRECTORY}/data-key-service-migration-cutover.sh',
         name,
         '1',
-        node_env_file,
         '-c',
     )
     bash = ' '.join(bash)
@@ -693,5 +673,9 @@ def config_meta(ctx):
     log.info('%s updated.', os.path.join(meta_path, env + '.meta'))
 
 
+if_utils.add_batch_command(cli)
+if_utils.add_daemon_command(cli)
+
+
 if __name__ == '__main__':
     cli()
@@ -22,7 +22,7 @@ import yaml
 
 from collections import defaultdict
 from dataclasses import dataclass, field
-from dotenv import load_dotenv, dotenv_values
+from dotenv import dotenv_values
 from if_utils import check_name
 from jmespath import search as jp
 from prometheus_client import Counter, Gauge, CollectorRegistry, push_to_gateway
@@ -35,10 +35,13 @@ FIELDS = ['logging_time', 'topic', 'partition',
 FIELDSSHORT = ['logging_time', 'topic', 'part',
                'src_offset', 'tgt_offset',
                'trail', 'complete']
+PREFETCHED_METRICS = dict()  # key:topic, value:metrics, filled by batch checks.
 
 
 def get_replication_metrics_single_topic2(project, dataset, topic, out_dir):
     """Get the offsets to a flat form."""
+    if topic in PREFETCHED_METRICS:
+        return PREFETCHED_METRICS.pop(topic)
     client = bigquery.Client(project=project)
     replication_status_query = """
         SELECT `offset_logging_time` AS `logging_time`, `topic`, `part_num` AS `partition`,
@@ -55,6 +58,27 @@ def get_replication_metrics_single_topic2(project, dataset, topic, out_dir):
     return datasize_records
 
 
+def get_replication_metrics_topics(project, dataset, topics):
+    """Get the offsets of several topics with a single query."""
+    client = bigquery.Client(project=project)
+    replication_status_query = """
+        SELECT `offset_logging_time` AS `logging_time`, `topic`, `part_num` AS `partition`,
+                 IF(`source_datasize` = 0, 0, `source_latest_offset`) AS `source_latest_offset`,
+                 IF(`source_datasize` = 0, 0, `target_latest_offset`) AS `target_latest_offset`,
+                 IF((`source_datasize` = 0) OR (`target_timestamp` = '1970-01-01 00:00:00 UTC') , 0, `trailing_by_offsets`) AS `trailing_by_offsets`,
+                 `percent_complete`
+        FROM `{0}.{1}.{2}`
+        WHERE `topic` IN UNNEST(@topics)
+        ORDER BY `percent_complete`;
+        """.format(project, dataset, "replication_status_complete_vw")
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ArrayQueryParameter('topics', 'STRING', topics)])
+    metrics = defaultdict(list)
+    for row in client.query(replication_status_query, job_config=job_config):
+        metrics[row['topic']].append(dict(row))
+    return metrics
+
+
 @click.group()
 def cli():
     """Group of commands."""
@@ -66,7 +90,6 @@ def cli():
 def check(ctx, json_string):
     json_obj = json.loads(json_string)
     name = json_obj['name']
-    thread_id = json_obj['thread_id']
     ok_trail = int(json_obj['meta'].get('ok_total_trail_offset') or 0)
     log = if_utils.get_logger(
         service_name=name, node_type='Kafka', node_action='check')
@@ -75,7 +98,6 @@ def check(ctx, json_string):
             1 == len(json_obj['parents'].keys())):
         log.info('Skipping {} from orphaned nodes.'.format(name))
         return
-    load_dotenv(f'.meta/{name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if environment == 'local':
         return
@@ -154,6 +176,25 @@ def check(ctx, json_string):
     ctx.exit(1)
 
 
+@if_utils.batch_action(cli, 'check')
+def check_batch(nodes):
+    """Query the offsets of every topic at once, then check each topic."""
+    node = nodes[0]
+    node_env = node.get('env', {})
+    if node_env.get('environment', os.getenv('environment')) != 'local':
+        project = node_env.get('KAFKA_MM2_PROJECT') or os.getenv('KAFKA_MM2_PROJECT')
+        dataset = node_env.get('KAFKA_MM2_DATASET') or os.getenv('KAFKA_MM2_DATASET')
+        metrics = get_replication_metrics_topics(
+            project, dataset, [node['name'] for node in nodes])
+        # Topics without rows are reported as not in bq by check
+        PREFETCHED_METRICS.update(
+            {node['name']: metrics.get(node['name'], []) for node in nodes})
+    try:
+        return if_utils.run_each(cli, 'check', nodes)
+    finally:
+        PREFETCHED_METRICS.clear()
+
+
 @cli.command()
 @click.argument('json_string', callback=check_name)
 @click.pass_context
@@ -405,5 +446,9 @@ def addcheck(ctx, writedown):
                 k_file.write(action)
 
 
+if_utils.add_batch_command(cli)
+if_utils.add_daemon_command(cli)
+
+
 if __name__ == '__main__':
     cli()
@@ -16,7 +16,6 @@ import os
 import prettytable
 import re
 
-from dotenv import load_dotenv
 from if_utils import check_name
 
 
@@ -40,9 +39,7 @@ def cli():
 def check(ctx, json_string):
     json_obj = json.loads(json_string)
     node_name = json_obj['name']
-    thread_id = json_obj['thread_id']
     log = if_utils.get_logger(node_name, 'S3', node_action='check')
-    load_dotenv(f'.meta/{node_name}-thread{thread_id}.env')
     environment = os.getenv('environment')
     if environment == 'local':
         return
@@ -101,5 +98,9 @@ def preflight(ctx, json_string):
     ctx.forward(check)
 
 
+if_utils.add_batch_command(cli)
+if_utils.add_daemon_command(cli)
+
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+"""Fork server of node interfaces.
+
+   Imports the interface modules once, then forks a child running the
+   action of every request, instead of starting a new interpreter.
+
+   Use example:
+      python if_forkserver.py /tmp/forkserver.sock App.py Database.py
+
+   Requests are JSON lines sent over the unix socket:
+      {"interface": "App", "action": "check", "params": ["<json_string>"]}
+   The output of the action is streamed back, followed by a NUL character
+   and the exit code of the action.
+"""
+import importlib.util
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import traceback
+
+import click
+
+# Preloaded for the interfaces
+import if_utils  # noqa: F401
+
+
+REAP_INTERVAL = 0.1
+
+
+def load_interfaces(paths):
+    """Import the interface modules, skip the ones failing to import."""
+    interfaces = dict()
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module
+            spec.loader.exec_module(module)
+            interfaces[name] = module
+        except Exception:
+            sys.modules.pop(name, None)
+            print(f'Not preloading {path}:\n{traceback.format_exc()}',
+                  file=sys.stderr)
+    return interfaces
+
+
+def run_child(conn, module, action, params):
+    """Run an action in the forked child, with its output sent to conn."""
+    exit_code = 1
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, sys.stdin.fileno())
+        os.dup2(conn.fileno(), sys.stdout.fileno())
+        os.dup2(conn.fileno(), sys.stderr.fileno())
+        conn.close()
+        module.cli.main(args=[action, *params],
+                        prog_name=module.__name__)
+        exit_code = 0
+    except SystemExit as error:
+        exit_code = error.code
+        if not isinstance(exit_code, int):
+            exit_code = 0 if exit_code is None else 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Don't run the handlers of the fork server
+        os._exit(exit_code)
+
+
+def handle_request(server, conn, interfaces, children):
+    """Fork a child running the requested action."""
+    try:
+        with conn.makefile('r') as requests:
+            request = json.loads(requests.readline())
+        module = interfaces[request['interface']]
+        action = request['action']
+        params = [str(param) for param in request.get('params', [])]
+    except (ValueError, KeyError, TypeError) as error:
+        conn.sendall(f'Invalid request: {error!r}\n\0' '1'.encode())
+        conn.close()
+        return
+    pid = os.fork()
+    if pid == 0:
+        # Clients get their end of stream once their own child is done
+        server.close()
+        for other_conn in children.values():
+            other_conn.close()
+        run_child(conn, module, action, params)
+    children[pid] = conn
+
+
+def reap_children(children):
+    """Send the exit code of the finished children to their clients."""
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        if os.WIFEXITED(status):
+            exit_code = os.WEXITSTATUS(status)
+        else:
+            exit_code = 128 + os.WTERMSIG(status)
+        try:
+            conn.sendall(f'\0{exit_code}'.encode())
+        except OSError:
+            pass
+        conn.close()
+
+
+def serve(socket_path, interfaces):
+    """Accept requests until the parent closes stdin."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(128)
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    selector.register(sys.stdin, selectors.EVENT_READ)
+    children = dict()  # key:child pid, value:client connection.
+    # Tell the parent which interfaces are ready
+    print(json.dumps(dict(interfaces=sorted(interfaces))), flush=True)
+    while True:
+        for key, _ in selector.select(timeout=REAP_INTERVAL):
+            if key.fileobj is server:
+                conn, _ = server.accept()
+                handle_request(server, conn, interfaces, children)
+            elif not sys.stdin.readline():
+                # Parent is gone
+                server.close()
+                os.unlink(socket_path)
+                return
+        reap_children(children)
+
+
+@click.command()
+@click.argument('socket_path')
+@click.argument('interface_paths', nargs=-1)
+def cli(socket_path, interface_paths):
+    """Preload interfaces and serve their actions over SOCKET_PATH."""
+    serve(socket_path, load_interfaces(interface_paths))
+
+
+if __name__ == '__main__':
+    cli()
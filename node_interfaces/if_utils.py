@@ -1,5 +1,7 @@
 """Utils for node interfaces modules."""
 
+import click
+import contextlib
 import glog
 import io
 import json
@@ -8,20 +10,34 @@ import os
 import re
 import sh
 import sys
+import traceback
 import unicodedata
 import inspect
 
+from collections import defaultdict
+
 
 SIMULATE_PROCESS_SECONDS = 1
 EXTERNAL_SCRIPTS_DIR = 'external_scripts'
 LOGS_DIRECTORY = 'logs/node_logs'
 PREFLIGHT_REPORT_PATH = 'logs/preflight-report.txt'
 DRYRUN_OUTFILE_PATH = 'logs/dryrun.log'
+BATCH_ACTIONS = defaultdict(dict)  # key:group of commands, value:dict action:function.
+# JSON argument of the node data sent over stdin
+STDIN_ARGUMENT = '-'
+
+
+def read_payload(value):
+    """Get a JSON argument, read from stdin when passed as `-`."""
+    if value == STDIN_ARGUMENT:
+        return sys.stdin.read()
+    return value
 
 
 def check_name(ctx, param, value):
-    """Parse json and check for the name value."""
+    """Parse json and check for the name value, apply the node environment."""
     json_object = {}
+    value = read_payload(value)
     try:
         json_object = json.loads(value)
     except Exception as e:
@@ -29,11 +45,20 @@ def check_name(ctx, param, value):
         ctx.exit(1)
 
     if 'name' in json_object:
+        if 'env' in json_object:
+            apply_node_env(json_object.pop('env'))
+            # Credentials stay out of the node data of the commands
+            value = json.dumps(json_object)
         return value
     print("Error: Missing name value in json argument.")
     ctx.exit(1)
 
 
+def apply_node_env(node_env):
+    """Set the environment resolved by mudra for the node, inherited by the scripts."""
+    os.environ.update({name: str(value) for name, value in node_env.items()})
+
+
 def get_log_path(service_name, node_type='', node_action=''):
     log_path = os.path.join(LOGS_DIRECTORY, node_type)
     os.makedirs(log_path, exist_ok=True)
@@ -129,3 +154,134 @@ def find_team_parents(json_obj):
              for parent in json_obj['parents'].values())
     teams = ','.join(teams)
     return parents, teams
+
+
+def add_daemon_command(group):
+    """Add the daemon command to an interface group of commands."""
+    @group.command()
+    def daemon():
+        """Serve actions as JSON-RPC requests over stdin/stdout."""
+        serve(group)
+
+
+def serve(group):
+    """Run actions of the group requested over stdin, one JSON-RPC request per line.
+
+    Request: {"jsonrpc": "2.0", "id": 1, "method": "check", "params": ["<json_string>"]}
+    Result: {"exit_code": 0, "output": "<printed output>"}
+    The batch method takes an action and a JSON list of nodes, its result
+    holds the result of every node by name.
+    """
+    responses = protect_stdout()
+    module = sys.modules[group.callback.__module__]
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            method = request['method']
+            params = [str(param) for param in request.get('params', [])]
+        except (ValueError, KeyError, TypeError) as error:
+            response = dict(error=dict(code=-32600,
+                                       message=f'Invalid request: {error}'),
+                            id=None)
+        else:
+            if method == 'batch':
+                result = run_batch(group, *params)
+            else:
+                result = run_action(group, module, method, params)
+            response = dict(result=result, id=request.get('id'))
+        responses.write(json.dumps(dict(jsonrpc='2.0', **response)) + '\n')
+        responses.flush()
+
+
+def protect_stdout():
+    """Get a stream to the original stdout, send the rest of the output to stderr."""
+    # Output of actions and their children goes to stderr
+    stream = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return stream
+
+
+def add_batch_command(group):
+    """Add the batch command to an interface group of commands."""
+    @group.command()
+    @click.argument('action')
+    @click.argument('json_string')
+    def batch(action, json_string):
+        """Run an action for a JSON list of nodes, print the results as JSON."""
+        results = protect_stdout()
+        results.write(json.dumps(
+            run_batch(group, action, read_payload(json_string))) + '\n')
+        results.flush()
+
+
+def batch_action(group, action):
+    """Register the function running an action for a batch of nodes.
+
+    The function receives the list of nodes and returns the result of every
+    node by name, the other actions run node by node."""
+    def decorator(function):
+        BATCH_ACTIONS[group][action] = function
+        return function
+    return decorator
+
+
+def run_batch(group, action, json_string):
+    """Run an action for a JSON list of nodes, get the result of every node."""
+    nodes = json.loads(json_string)
+    function = BATCH_ACTIONS[group].get(action)
+    if not function:
+        return run_each(group, action, nodes)
+    try:
+        return function(nodes)
+    except Exception:
+        output = traceback.format_exc()
+        return {node['name']: dict(exit_code=1, output=output)
+                for node in nodes}
+
+
+def run_each(group, action, nodes):
+    """Run an action node by node in this process."""
+    module = sys.modules[group.callback.__module__]
+    return {node['name']: run_action(group, module, action, [json.dumps(node)])
+            for node in nodes}
+
+
+def run_action(group, module, method, params):
+    """Run an action in this process and restore the state it changed."""
+    environ = dict(os.environ)
+    module_state = {name: value for name, value in vars(module).items()
+                    if isinstance(value, (bool, int, float, str, type(None)))}
+    log_handlers = list(glog.logger.handlers)
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            exit_code = group.main(args=[method, *params],
+                                   prog_name=module.__name__,
+                                   standalone_mode=False)
+        # Exit code of ctx.exit, otherwise the return value of the command
+        if not isinstance(exit_code, int):
+            exit_code = 0
+    except click.ClickException as error:
+        output.write(error.format_message() + '\n')
+        exit_code = error.exit_code
+    except click.Abort:
+        exit_code = 1
+    except SystemExit as error:
+        exit_code = error.code
+        if not isinstance(exit_code, int):
+            exit_code = 0 if exit_code is None else 1
+    except Exception:
+        output.write(traceback.format_exc())
+        exit_code = 1
+    finally:
+        # Loaded dotenv files, dryrun flags and node log files are per action
+        os.environ.clear()
+        os.environ.update(environ)
+        vars(module).update(module_state)
+        for handler in glog.logger.handlers:
+            if handler not in log_handlers:
+                glog.logger.removeHandler(handler)
+                handler.close()
+    return dict(exit_code=exit_code, output=output.getvalue())
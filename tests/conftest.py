@@ -0,0 +1,81 @@
+"""Run mudra.py on small data files, with a node interface recording its calls."""
+
+import importlib.util
+import itertools
+import pathlib
+import textwrap
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+# Node interface appending "{action} {node name}" to calls.log
+RECORDING_INTERFACE = textwrap.dedent('''\
+    #!/usr/bin/env python3
+    import json
+    import sys
+
+    action = sys.argv[1]
+    node = json.loads(sys.stdin.read())
+    with open('calls.log', 'a') as calls:
+        calls.write(f"{action} {node['name']}\\n")
+    ''')
+# db is stopped in phase 1 and started in phase 2, app depends on db
+MANIFESTS = {
+    'db': dict(name='db', type='Service', dependencies={},
+               actions=dict(stop=dict(phases=[1]), start=dict(phases=[2]))),
+    'app': dict(name='app', type='Service', dependencies=dict(Service=['db']),
+                actions=dict(stop=dict(phases=[1]), start=dict(phases=[2]))),
+}
+module_ids = itertools.count()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Data files of the `test` environment and the node interfaces, as the working directory"""
+    interface = tmp_path / 'node_interfaces' / 'Service.py'
+    interface.parent.mkdir()
+    interface.write_text(RECORDING_INTERFACE)
+    interface.chmod(0o755)
+    nodes = tmp_path / 'data' / 'nodes'
+    nodes.mkdir(parents=True)
+    for name, manifest in MANIFESTS.items():
+        (nodes / f'{name}.yaml').write_text(yaml.safe_dump(manifest))
+    environments = tmp_path / 'data' / 'environments'
+    environments.mkdir()
+    (environments / 'test.meta').write_text('')
+    (environments / 'test.creds').write_text('')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def load_mudra(workspace):
+    """Load mudra.py, a fresh module every time as the Mudra settings are class attributes"""
+    def load():
+        spec = importlib.util.spec_from_file_location(
+            f'mudra_cli_{next(module_ids)}', ROOT / 'mudra.py')
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+
+@pytest.fixture
+def run_mudra(load_mudra):
+    """Run the mudra command line"""
+    def run(*args):
+        return CliRunner().invoke(
+            load_mudra().cli, ['--datafiles', 'data', '--environment', 'test', *args])
+    return run
+
+
+@pytest.fixture
+def calls(workspace):
+    """Get the node interface calls, "{action} {node name}" """
+    def read():
+        calls_log = workspace / 'calls.log'
+        return calls_log.read_text().splitlines() if calls_log.exists() else []
+    return read
@@ -0,0 +1,34 @@
+from mudra.components import Node
+from mudra.journal import SUCCEEDED, RunJournal
+
+
+def interrupted_stop(workspace, node_name):
+    """Journal the phase 1 stop of a node as left running by a dead process of this host"""
+    (workspace / 'logs').mkdir(exist_ok=True)
+    journal = RunJournal(str(workspace / 'logs' / 'run_state.db'))
+    journal.start(Node(node_name, 'Service'), 'test', 1, 'stop')
+    journal.connection.execute('UPDATE actions SET pid = 0')
+    return journal
+
+
+def test_quarantine_skips_the_dependents(workspace, run_mudra, calls):
+    interrupted_stop(workspace, 'db')
+    result = run_mudra('--phase', '1', '--inflight', 'quarantine')
+    assert result.exit_code == 0, result.output
+    # app depends on db
+    assert calls() == []
+
+
+def test_recheck_marks_the_checked_action_succeeded(workspace, run_mudra, calls):
+    journal = interrupted_stop(workspace, 'db')
+    result = run_mudra('--phase', '1', '--inflight', 'recheck')
+    assert result.exit_code == 0, result.output
+    assert calls() == ['check db', 'stop app']
+    assert journal.lookup('db', 'test', 1, 'stop')['status'] == SUCCEEDED
+
+
+def test_resume_skips_the_completed_nodes(run_mudra, calls):
+    run_mudra('--phase', '1')
+    result = run_mudra()
+    assert result.exit_code == 0, result.output
+    assert calls() == ['stop db', 'stop app', 'start db', 'start app']
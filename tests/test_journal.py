@@ -0,0 +1,77 @@
+import os
+import socket
+import time
+
+from mudra.journal import SUCCEEDED, RunJournal, parse_marker
+
+
+ENVIRONMENTS = ['prod-eu-1', 'prod', 'eu-1']
+NODE_TYPES = {'app-prod': 'App', 'db': 'Database'}
+
+
+def test_parse_marker_with_dashes_in_the_environment():
+    assert parse_marker('web-prod-eu-1-1-start', ENVIRONMENTS, NODE_TYPES) == \
+        ('web', 'prod-eu-1', 1, 'start')
+
+
+def test_parse_marker_prefers_known_nodes():
+    assert parse_marker('app-prod-prod-2-check', ENVIRONMENTS, NODE_TYPES) == \
+        ('app-prod', 'prod', 2, 'check')
+
+
+def test_parse_marker_of_unknown_environment():
+    assert parse_marker('db-staging-1-start', ENVIRONMENTS, NODE_TYPES) is None
+    assert parse_marker('db-prod-start', ENVIRONMENTS, NODE_TYPES) is None
+
+
+def test_import_markers_keeps_unknown_markers(tmp_path):
+    directory = tmp_path / 'executed_nodes'
+    directory.mkdir()
+    (directory / 'db-prod-eu-1-1-start').write_text('hash')
+    (directory / 'db-staging-1-start').write_text('')
+    journal = RunJournal(str(tmp_path / 'run_state.db'))
+    journal.import_markers(str(directory), ENVIRONMENTS, NODE_TYPES)
+    state = journal.lookup('db', 'prod-eu-1', 1, 'start')
+    assert state['status'] == SUCCEEDED
+    assert state['inputs_hash'] == 'hash'
+    assert state['node_type'] == 'Database'
+    assert os.listdir(directory) == ['db-staging-1-start']
+
+
+def test_import_markers_removes_the_imported_directory(tmp_path):
+    directory = tmp_path / 'executed_nodes'
+    directory.mkdir()
+    (directory / 'db-prod-2-check').write_text('')
+    journal = RunJournal(str(tmp_path / 'run_state.db'))
+    journal.import_markers(str(directory), ENVIRONMENTS, NODE_TYPES)
+    assert journal.lookup('db', 'prod', 2, 'check')['inputs_hash'] is None
+    assert not directory.exists()
+
+
+class Node:
+    name = 'db'
+    type = 'Database'
+
+
+def running_on(journal, host, pid):
+    journal.start(Node, 'prod', 1, 'start')
+    journal.connection.execute('UPDATE actions SET host = ?, pid = ?', (host, pid))
+
+
+def test_stale_action_of_this_host(tmp_path):
+    journal = RunJournal(str(tmp_path / 'run_state.db'))
+    journal.start(Node, 'prod', 1, 'start')
+    assert journal.stale('prod') == []
+    running_on(journal, socket.gethostname(), 0)
+    assert len(journal.stale('prod')) == 1
+
+
+def test_stale_action_of_another_host_waits_for_its_lease(tmp_path):
+    journal = RunJournal(str(tmp_path / 'run_state.db'))
+    running_on(journal, 'other-host', 42)
+    journal.connection.execute(
+        'INSERT INTO leases (name, owner, host, pid, expires_at) VALUES (?, ?, ?, ?, ?)',
+        ('db-start', 'other-host:42', 'other-host', 42, time.time() + 60))
+    assert journal.stale('prod') == []
+    journal.connection.execute('UPDATE leases SET expires_at = ?', (time.time() - 1,))
+    assert len(journal.stale('prod')) == 1
@@ -0,0 +1,64 @@
+import click
+import pytest
+
+from mudra.components import Node
+from mudra.limits import ConcurrencyLimits, ConcurrencyPool
+
+
+def limits(*pools):
+    nodes = {
+        'db-1': Node('db-1', 'Database', meta={'NAMESPACE': 'payments'}),
+        'db-2': Node('db-2', 'Database', meta={'NAMESPACE': 'checkout'}),
+        'db-3': Node('db-3', 'Database', meta={'NAMESPACE': 'payments'}),
+        'app-1': Node('app-1', 'App', labels=['migration']),
+    }
+    return ConcurrencyLimits([ConcurrencyPool.parse(pool) for pool in pools], nodes)
+
+
+def test_parse_pool():
+    assert ConcurrencyPool.parse('type:Database=4') == ConcurrencyPool('type', 'Database', 4)
+    assert str(ConcurrencyPool.parse('meta:K8S_TARGET_NAMESPACE=10')) == 'meta:K8S_TARGET_NAMESPACE=10'
+
+
+@pytest.mark.parametrize('text', ['Database=4', 'type:Database', 'owner:me=1', 'type:App=0'])
+def test_parse_invalid_pool(text):
+    with pytest.raises(click.ClickException):
+        ConcurrencyPool.parse(text)
+
+
+def test_type_pool_caps_running_nodes():
+    type_limits = limits('type:Database=2')
+    assert type_limits.acquire('db-1')
+    assert type_limits.acquire('db-2')
+    assert not type_limits.acquire('db-3')
+    # Nodes outside of the pool are not limited
+    assert type_limits.acquire('app-1')
+    type_limits.release('db-1')
+    assert type_limits.acquire('db-3')
+
+
+def test_meta_pool_holds_one_limit_per_value():
+    meta_limits = limits('meta:NAMESPACE=1')
+    assert meta_limits.acquire('db-1')
+    assert meta_limits.acquire('db-2')
+    assert not meta_limits.acquire('db-3')
+
+
+def test_full_pool_takes_no_slot_in_the_other_pools():
+    both_limits = limits('type:Database=1', 'meta:NAMESPACE=1')
+    assert both_limits.acquire('db-1')
+    assert not both_limits.acquire('db-2')
+    both_limits.release('db-1')
+    assert both_limits.acquire('db-2')
+    assert both_limits.acquire('app-1')
+
+
+def test_label_pool():
+    label_limits = limits('label:migration=1')
+    assert label_limits.acquire('app-1')
+    assert not label_limits.acquire('app-1')
+    assert label_limits.acquire('db-1')
+
+
+def test_no_pools():
+    assert not limits()
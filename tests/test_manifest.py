@@ -0,0 +1,53 @@
+import mudra.manifest as manifest
+from mudra.manifest import CACHE_MISS, ManifestCache, parse_manifest, parse_manifests
+
+
+def counting_parser(monkeypatch):
+    """Count the files parsed by parse_manifests"""
+    parsed = []
+
+    def parse(path):
+        parsed.append(path)
+        return parse_manifest(path)
+
+    monkeypatch.setattr(manifest, 'parse_manifest', parse)
+    return parsed
+
+
+def test_cached_manifests_are_not_parsed_again(tmp_path, monkeypatch):
+    node = tmp_path / 'node.yaml'
+    node.write_text('name: db\ntype: Database\n')
+    empty = tmp_path / 'empty.yaml'
+    empty.write_text('')
+    paths = [str(node), str(empty)]
+    cache = ManifestCache(str(tmp_path / 'cache.pickle'))
+    assert parse_manifests(paths, cache=cache) == [
+        ({'name': 'db', 'type': 'Database'}, None), (None, None)]
+    parsed = counting_parser(monkeypatch)
+    cache = ManifestCache(str(tmp_path / 'cache.pickle'))
+    assert parse_manifests(paths, cache=cache) == [
+        ({'name': 'db', 'type': 'Database'}, None), (None, None)]
+    assert parsed == []
+    assert not cache.changed
+
+
+def test_changed_manifest_is_parsed_again(tmp_path, monkeypatch):
+    node = tmp_path / 'node.yaml'
+    node.write_text('name: db\n')
+    cache = ManifestCache(str(tmp_path / 'cache.pickle'))
+    parse_manifests([str(node)], cache=cache)
+    node.write_text('name: database\n')
+    parsed = counting_parser(monkeypatch)
+    assert parse_manifests([str(node)], cache=cache) == [({'name': 'database'}, None)]
+    assert parsed == [str(node)]
+
+
+def test_cache_keeps_the_signature_of_the_parsed_content(tmp_path):
+    node = tmp_path / 'node.yaml'
+    node.write_text('name: db\n')
+    data, error, signature = parse_manifest(str(node))
+    # Edited after parsing, before caching
+    node.write_text('name: database\n')
+    cache = ManifestCache(str(tmp_path / 'cache.pickle'))
+    cache.put(str(node), data, signature)
+    assert cache.get(str(node)) is CACHE_MISS
@@ -0,0 +1,18 @@
+import logging
+
+from mudra import mlog
+from mudra.tasks import NodeTask
+
+
+def test_skipped_node_stops_its_thread_log(workspace, load_mudra):
+    (workspace / 'logs' / 'thread_logs').mkdir(parents=True, exist_ok=True)
+    module = load_mudra()
+    app = module.Mudra()
+    app.maxworkers = 2
+    app.skipnodes = ['db']
+    handlers = list(logging.getLogger().handlers)
+    thread_handlers = dict(mlog.HANDLERS)
+    task = NodeTask(name='db', type='Service', phase=1, actions=['stop'], node={})
+    assert app.do_orchestration(task) is None
+    assert logging.getLogger().handlers == handlers
+    assert mlog.HANDLERS == thread_handlers
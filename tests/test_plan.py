@@ -0,0 +1,21 @@
+def test_apply_with_dryrun_stays_a_dry_run(run_mudra, calls):
+    assert run_mudra('--phase', '1', '--plan', 'test.plan').exit_code == 0
+    assert calls() == []
+    result = run_mudra('--apply', 'test.plan', '--dryrun')
+    assert result.exit_code == 0, result.output
+    assert calls() == ['stopdryrun db', 'stopdryrun app']
+
+
+def test_apply_runs_the_compiled_actions(run_mudra, calls):
+    run_mudra('--phase', '1', '--plan', 'test.plan')
+    result = run_mudra('--apply', 'test.plan')
+    assert result.exit_code == 0, result.output
+    assert calls() == ['stop db', 'stop app']
+
+
+def test_apply_refuses_other_preflight_option(run_mudra, calls):
+    run_mudra('--phase', '1', '--plan', 'test.plan')
+    result = run_mudra('--apply', 'test.plan', '--preflight')
+    assert result.exit_code != 0
+    assert 'compiled with preflight False' in result.output
+    assert calls() == []
@@ -0,0 +1,4 @@
+def test_preflight_runs_once_per_node(run_mudra, calls):
+    result = run_mudra('--preflight')
+    assert result.exit_code == 0, result.output
+    assert calls() == ['preflight db', 'preflight app']
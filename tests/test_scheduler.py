@@ -0,0 +1,120 @@
+import concurrent.futures
+
+import networkx as nx
+
+from mudra.scheduler import ReadyQueue, Scheduler, critical_path_priorities, pipeline_graph
+
+
+def chain_graph():
+    """a depends on b, b depends on c"""
+    return nx.DiGraph([('a', 'b'), ('b', 'c')])
+
+
+def drain(queue):
+    """Pop and complete every ready node, get the dispatch order"""
+    order = []
+    while queue:
+        node = queue.pop()
+        order.append(node)
+        queue.complete(node)
+    return order
+
+
+def test_ready_queue_follows_dependencies():
+    queue = ReadyQueue(chain_graph())
+    assert drain(queue) == ['c', 'b', 'a']
+    assert queue.remaining == 0
+
+
+def test_ready_queue_waits_for_every_dependency():
+    graph = nx.DiGraph([('app', 'db'), ('app', 'dns')])
+    queue = ReadyQueue(graph)
+    first = queue.pop()
+    queue.complete(first)
+    assert queue.pop() != 'app'
+    assert not queue
+
+
+def test_ready_queue_pops_highest_priority_first():
+    graph = nx.DiGraph()
+    graph.add_nodes_from(['low', 'high', 'middle'])
+    queue = ReadyQueue(graph, {'low': 1, 'high': 10, 'middle': 5})
+    assert drain(queue) == ['high', 'middle', 'low']
+
+
+def test_ready_queue_keeps_insertion_order_on_ties():
+    graph = nx.DiGraph()
+    graph.add_nodes_from(['first', 'second', 'third'])
+    queue = ReadyQueue(graph, {'second': 1})
+    assert drain(queue) == ['second', 'first', 'third']
+
+
+def test_ready_queue_pushed_back_node_is_ready_again():
+    graph = nx.DiGraph()
+    graph.add_nodes_from(['a', 'b'])
+    queue = ReadyQueue(graph)
+    node = queue.pop()
+    queue.push(node)
+    assert sorted(drain(queue)) == ['a', 'b']
+
+
+def test_ready_queue_take_removes_matching_nodes():
+    graph = nx.DiGraph()
+    graph.add_nodes_from(['s3-1', 'db-1', 's3-2', 's3-3'])
+    queue = ReadyQueue(graph, {'s3-3': 2})
+    taken = queue.take(lambda node: node.startswith('s3'), 2)
+    assert taken == ['s3-3', 's3-1']
+    # The heap is still ordered after the removal
+    assert drain(queue) == ['db-1', 's3-2']
+
+
+def test_critical_path_priorities_sum_remaining_durations():
+    priorities = critical_path_priorities(chain_graph(), {'a': 1, 'b': 2, 'c': 3})
+    assert priorities == {'a': 1, 'b': 3, 'c': 6}
+
+
+def test_pipeline_graph_chains_phases():
+    pipeline = pipeline_graph(nx.DiGraph([('a', 'b')]), [1, 2])
+    assert set(pipeline.edges) == {
+        (('a', 1), ('b', 1)),
+        (('a', 2), ('b', 2)),
+        (('a', 2), ('a', 1)),
+        (('b', 2), ('b', 1)),
+    }
+
+
+def test_scheduler_runs_nodes_after_their_dependencies():
+    submitted = []
+
+    def submit(node):
+        submitted.append(node)
+        return executor.submit(str.upper, node)
+
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        Scheduler(chain_graph(), 2).run(submit)
+    assert submitted == ['c', 'b', 'a']
+
+
+def test_scheduler_reports_completed_nodes():
+    completed = []
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        Scheduler(chain_graph(), 2).run(
+            lambda node: executor.submit(str.upper, node),
+            lambda node, result: completed.append((node, result)))
+    assert completed == [('c', 'C'), ('b', 'B'), ('a', 'A')]
+
+
+def test_scheduler_batches_ready_nodes_with_the_same_key():
+    graph = nx.DiGraph()
+    graph.add_nodes_from(['s3-1', 's3-2', 's3-3', 'db-1'])
+    batches = []
+
+    def submit(batch):
+        batches.append(batch)
+        future = concurrent.futures.Future()
+        future.set_result([None] * len(batch))
+        return future
+
+    Scheduler(graph, 1, batch_key=lambda node: node.split('-')[0],
+              batch_size=2).run(submit)
+    assert batches == [['s3-1', 's3-2'], ['s3-3'], ['db-1']]
@@ -0,0 +1,69 @@
+import click
+import networkx as nx
+import pytest
+
+from mudra.components import Node
+from mudra.selection import parse_filter, select_nodes, selected_graph
+
+
+def test_parse_filter_terms():
+    assert parse_filter('type=App,team!=payments|checkout, edge-*') == [
+        ('type', False, ['App']),
+        ('team', True, ['payments', 'checkout']),
+        ('name', False, ['edge-*']),
+    ]
+
+
+def test_parse_filter_rejects_empty_filter():
+    with pytest.raises(click.ClickException):
+        parse_filter(' , ')
+
+
+def test_selected_graph_keeps_order_through_unselected_nodes():
+    # app -> cache -> db -> dns, cache and db are left out
+    graph = nx.DiGraph([('app', 'cache'), ('cache', 'db'), ('db', 'dns')])
+    subgraph = selected_graph(graph, {'app', 'dns'})
+    assert set(subgraph.nodes) == {'app', 'dns'}
+    assert set(subgraph.edges) == {('app', 'dns')}
+
+
+def test_selected_graph_stops_at_the_first_selected_dependency():
+    graph = nx.DiGraph([('app', 'cache'), ('cache', 'db'), ('db', 'dns')])
+    subgraph = selected_graph(graph, {'app', 'db', 'dns'})
+    assert set(subgraph.edges) == {('app', 'db'), ('db', 'dns')}
+
+
+def test_selected_graph_follows_every_unselected_branch():
+    graph = nx.DiGraph([('app', 'left'), ('app', 'right'),
+                        ('left', 'db'), ('right', 'dns')])
+    subgraph = selected_graph(graph, {'app', 'db', 'dns'})
+    assert set(subgraph.edges) == {('app', 'db'), ('app', 'dns')}
+
+
+def nodes_graph():
+    nodes = {
+        'web': Node('web', 'App', file_name='nodes/checkout/web.yaml', labels=['edge']),
+        'api': Node('api', 'App', file_name='nodes/payments/api.yaml'),
+        'db': Node('db', 'Database', file_name='nodes/payments/db.yaml'),
+    }
+    return nx.DiGraph([('web', 'api'), ('api', 'db')]), nodes
+
+
+def test_select_nodes_by_type_and_filter():
+    graph, nodes = nodes_graph()
+    assert select_nodes(graph, nodes, node_type='App') == {'web', 'api'}
+    assert select_nodes(graph, nodes, node_filter='team=payments,type!=Database') == {'api'}
+    assert select_nodes(graph, nodes, node_filter='label=edge') == {'web'}
+    assert select_nodes(graph, nodes, node_filter='a*') == {'api'}
+
+
+def test_select_nodes_with_ancestors_and_descendants():
+    graph, nodes = nodes_graph()
+    assert select_nodes(graph, nodes, names=['api'], ancestors=True) == {'web', 'api'}
+    assert select_nodes(graph, nodes, names=['api'], descendants=True) == {'api', 'db'}
+
+
+def test_select_nodes_rejects_unknown_nodes():
+    graph, nodes = nodes_graph()
+    with pytest.raises(click.ClickException):
+        select_nodes(graph, nodes, names=['missing'])
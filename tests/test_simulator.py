@@ -0,0 +1,84 @@
+import logging
+
+import click
+import glog
+import networkx as nx
+import pytest
+
+from mudra.components import Node
+from mudra.limits import ConcurrencyLimits, ConcurrencyPool
+from mudra.simulator import Simulation, critical_path, parse_worker_counts, simulate
+
+
+def fan_graph():
+    """app depends on three independent databases"""
+    return nx.DiGraph([('app', 'db-1'), ('app', 'db-2'), ('app', 'db-3')])
+
+
+DURATIONS = {'app': 1, 'db-1': 4, 'db-2': 2, 'db-3': 2}
+
+
+def test_simulate_one_worker_runs_nodes_one_after_the_other():
+    assert simulate(fan_graph(), DURATIONS, 1) == Simulation(9, 9)
+
+
+def test_simulate_runs_independent_nodes_in_parallel():
+    assert simulate(fan_graph(), DURATIONS, 3) == Simulation(5, 9)
+
+
+def test_simulate_dispatches_by_priority():
+    # The longest node first keeps the second worker busy with the short ones
+    priority = {'db-1': 2, 'db-2': 1, 'db-3': 1}
+    assert simulate(fan_graph(), DURATIONS, 2, priority).makespan == 5
+    priority = {'db-1': 0, 'db-2': 1, 'db-3': 1}
+    assert simulate(fan_graph(), DURATIONS, 2, priority).makespan == 7
+
+
+def test_simulate_respects_pools():
+    nodes = {name: Node(name, 'Database' if name.startswith('db') else 'App')
+             for name in fan_graph()}
+    limits = ConcurrencyLimits([ConcurrencyPool.parse('type:Database=1')], nodes)
+    assert simulate(fan_graph(), DURATIONS, 3, limits=limits).makespan == 9
+
+
+def test_simulations_add_up():
+    assert Simulation(1, 2) + Simulation(3, 4) == Simulation(4, 6)
+
+
+def test_critical_path():
+    assert critical_path(fan_graph(), DURATIONS) == (['db-1', 'app'], 5)
+    assert critical_path(nx.DiGraph(), DURATIONS) == ([], 0)
+
+
+def test_parse_worker_counts():
+    assert parse_worker_counts('1-3,8,2') == [1, 2, 3, 8]
+
+
+@pytest.mark.parametrize('text', ['', '0', 'four', '3-x'])
+def test_parse_invalid_worker_counts(text):
+    with pytest.raises(click.ClickException):
+        parse_worker_counts(text)
+
+
+class GlogRecorder(logging.Handler):
+    """Format the records with the glog formatter, formatting errors are raised"""
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(glog.GlogFormatter())
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+def test_report_simulation_through_the_glog_formatter(run_mudra):
+    recorder = GlogRecorder()
+    glog.logger.addHandler(recorder)
+    try:
+        result = run_mudra('--phase', '1', '--simulate', '1,2')
+    finally:
+        glog.logger.removeHandler(recorder)
+    assert result.exit_code == 0, result.output
+    assert any(message.endswith('Maxworkers 2: makespan 2.0s, worker utilization 50%')
+               for message in recorder.messages)